@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_asgi_application()
+
+# counters are rebuilt before the first request is checked
+from bank_agent.velocity import velocity_limits  # noqa: E402
+
+velocity_limits.rebuild()
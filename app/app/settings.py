@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 import os
+from decimal import Decimal
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -130,6 +131,79 @@ STATIC_URL = "/static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
+# Negative cache of accounts banks reported as invalid
+
+INVALID_ACCOUNT_CACHE_TTL = int(os.getenv("INVALID_ACCOUNT_CACHE_TTL", "300"))
+INVALID_ACCOUNT_CACHE_SIZE = int(
+    os.getenv("INVALID_ACCOUNT_CACHE_SIZE", "100000")
+)
+
+
+# Bank lookup used by the transfer form
+
+BANK_LOOKUP_LIMIT = 20
+BANK_LOOKUP_CACHE_TTL = int(os.getenv("BANK_LOOKUP_CACHE_TTL", "60"))
+
+
+# Transport used to reach the banks: http, record or replay
+
+BANK_TRANSPORT = os.getenv("BANK_TRANSPORT", "http")
+BANK_TRANSPORT_LOG = os.getenv("BANK_TRANSPORT_LOG", "bank_traffic.jsonl")
+BANK_TRANSPORT_REPLAY_SPEED = float(
+    os.getenv("BANK_TRANSPORT_REPLAY_SPEED", "1")
+)
+BANK_TRANSPORT_REPLAY_MATCH = os.getenv("BANK_TRANSPORT_REPLAY_MATCH", "exact")
+
+
+# Per account velocity limits over a sliding window, disabled when unset
+
+VELOCITY_WINDOW = int(os.getenv("VELOCITY_WINDOW", "3600"))
+VELOCITY_MAX_TRANSFERS = (
+    int(os.getenv("VELOCITY_MAX_TRANSFERS"))
+    if os.getenv("VELOCITY_MAX_TRANSFERS")
+    else None
+)
+VELOCITY_MAX_AMOUNT = (
+    Decimal(os.getenv("VELOCITY_MAX_AMOUNT"))
+    if os.getenv("VELOCITY_MAX_AMOUNT")
+    else None
+)
+
+
+# Bank settlement callbacks, buffered and applied in batches
+
+CALLBACK_FLUSH_DELAY = float(os.getenv("CALLBACK_FLUSH_DELAY", "0.05"))
+CALLBACK_BATCH_SIZE = int(os.getenv("CALLBACK_BATCH_SIZE", "1000"))
+
+
+# Admission control, transfer submissions are shed once this many
+# outbound bank calls are in flight (per process)
+
+ADMISSION_MAX_OUTSTANDING = int(os.getenv("ADMISSION_MAX_OUTSTANDING", "64"))
+ADMISSION_MAX_OUTSTANDING_PER_BANK = int(
+    os.getenv("ADMISSION_MAX_OUTSTANDING_PER_BANK", "16")
+)
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "5"))
+
+
+# Per bank timeouts, the p99 latency of each operation times a multiplier
+# within floor and ceiling seconds
+
+BANK_TIMEOUT_PERCENTILE = float(os.getenv("BANK_TIMEOUT_PERCENTILE", "0.99"))
+BANK_TIMEOUT_MULTIPLIER = float(os.getenv("BANK_TIMEOUT_MULTIPLIER", "3"))
+BANK_TIMEOUT_FLOOR = float(os.getenv("BANK_TIMEOUT_FLOOR", "0.5"))
+BANK_TIMEOUT_CEILING = float(os.getenv("BANK_TIMEOUT_CEILING", "30"))
+BANK_TIMEOUT_DEFAULT = float(os.getenv("BANK_TIMEOUT_DEFAULT", "10"))
+
+
+# Inter-bank settlement windows, transfers between the same two banks are
+# collected for this many seconds and sent as batched operations to banks
+# that support them, 0 sends every transfer on its own
+
+SETTLEMENT_WINDOW = float(os.getenv("SETTLEMENT_WINDOW", "0"))
+SETTLEMENT_BATCH_SIZE = int(os.getenv("SETTLEMENT_BATCH_SIZE", "100"))
+
+
 # Initial admin
 
 ADMIN_USERNAME = os.environ.get("DJANGO_SUPERUSER_USERNAME")
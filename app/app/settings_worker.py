@@ -0,0 +1,24 @@
+"""
+Slim settings profile for worker and batch commands.
+
+Drops the apps, middleware and template engine that only the web front
+end needs so headless ``manage.py`` invocations start faster. Use it with:
+
+    DJANGO_SETTINGS_MODULE=app.settings_worker python manage.py <command>
+"""
+
+from app.settings import *  # noqa: F401,F403
+
+
+INSTALLED_APPS = [
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    # local
+    "bank_agent.apps.BankAgentConfig",
+]
+
+MIDDLEWARE = []
+
+ROOT_URLCONF = "app.urls_worker"
+
+TEMPLATES = []
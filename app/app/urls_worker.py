@@ -0,0 +1,7 @@
+"""app URL Configuration for the slim worker settings profile
+
+Workers do not serve HTTP, so no routes are exposed.
+"""
+
+
+urlpatterns = []
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_wsgi_application()
+
+# counters are rebuilt before the first request is checked
+from bank_agent.velocity import velocity_limits  # noqa: E402
+
+velocity_limits.rebuild()
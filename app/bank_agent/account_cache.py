@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+
+# substrings of bank 400 messages meaning the account can never succeed
+INVALID_ACCOUNT_MESSAGES = ("does not exist", "closed")
+
+
+class InvalidAccountCache:
+    """TTL bounded negative cache of accounts a bank reported as invalid
+
+    Entries are keyed on (bank uuid, account id) and hold the message the
+    bank answered with, so a transfer touching the account can be rejected
+    locally with the same detail instead of repeating the round trip.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 100_000) -> None:
+        """
+        Parameters
+        ----------
+        ttl : float
+            Seconds an entry stays valid
+        max_size : int
+            Maximum number of entries, oldest entries are evicted first
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, bank_id: str, account_id: str) -> Optional[str]:
+        """Returns the cached bank message if the account is known invalid
+
+        Parameters
+        ----------
+        bank_id : str
+            Bank uuid
+        account_id : str
+            Account uuid
+
+        Returns
+        -------
+        Optional[str]
+            Bank message or None when the account is not cached
+        """
+        key = (str(bank_id), str(account_id))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return entry[1]
+
+    def add(self, bank_id: str, account_id: str, message: str) -> None:
+        """Marks an account as invalid for the cache ttl
+
+        Parameters
+        ----------
+        bank_id : str
+            Bank uuid
+        account_id : str
+            Account uuid
+        message : str
+            Message returned by the bank
+        """
+        key = (str(bank_id), str(account_id))
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.ttl, message)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, bank_id: str, account_id: str = None) -> None:
+        """Removes an account, or every account of a bank, from the cache
+
+        Parameters
+        ----------
+        bank_id : str
+            Bank uuid
+        account_id : str, optional
+            Account uuid, all accounts of the bank when not given
+        """
+        bank_id = str(bank_id)
+        with self._lock:
+            if account_id is not None:
+                self._entries.pop((bank_id, str(account_id)), None)
+                return
+
+            for key in [key for key in self._entries if key[0] == bank_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """Removes every entry and resets the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the hit and miss counters and the number of entries"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+            }
+
+
+def is_invalid_account_message(messages) -> bool:
+    """Checks if bank error messages say the account does not exist
+
+    Parameters
+    ----------
+    messages : list or str
+        Messages returned by the bank for a field
+
+    Returns
+    -------
+    bool
+        True if the account can never be used
+    """
+    if isinstance(messages, str):
+        messages = [messages]
+    return any(
+        text in str(message).lower()
+        for message in messages
+        for text in INVALID_ACCOUNT_MESSAGES
+    )
+
+
+invalid_accounts = InvalidAccountCache(
+    ttl=settings.INVALID_ACCOUNT_CACHE_TTL,
+    max_size=settings.INVALID_ACCOUNT_CACHE_SIZE,
+)
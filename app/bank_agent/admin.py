@@ -1,7 +1,102 @@
+import uuid
+
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from bank_agent.models import Bank, ScheduledTransfer, TransferRequest
+
+
+class CappedCountPaginator(Paginator):
+    """Paginator that stops counting rows after ``max_count``
+
+    Counting a large filtered changelist scans every matching row, capping
+    the count keeps the work bounded and only limits how deep one can page
+    without narrowing the filters.
+    """
+
+    max_count = 10_000
+
+    @cached_property
+    def count(self) -> int:
+        return (
+            self.object_list.order_by()
+            .values("pk")[: self.max_count]
+            .count()
+        )
+
+
+@admin.register(Bank)
+class BankAdmin(admin.ModelAdmin):
+    list_display = ("name", "uuid", "url", "supports_batch")
+    # prefix and exact lookups so the name and uuid indexes are used
+    search_fields = ("^name", "=uuid")
+    ordering = ("name",)
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(TransferRequest)
+class TransferRequestAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "source_bank",
+        "source_account_id",
+        "destination_bank",
+        "destination_account_id",
+        "amount",
+        "completed",
+        "created",
+    )
+    list_select_related = ("source_bank", "destination_bank")
+    # ranges on the created index, a date hierarchy lists the distinct
+    # dates of the whole table on every landing page
+    list_filter = ("completed", ("created", admin.DateFieldListFilter))
+    # shows the search box, the lookups are made by get_search_results
+    search_fields = ("=source_account_id", "=destination_account_id")
+    autocomplete_fields = ("source_bank", "destination_bank")
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        """Matches the search term as an account id
 
-from bank_agent.models import Bank, TransferRequest
+        The default exact lookups compare the text of the uuid column and
+        scan the table, the term is parsed so the account id indexes are
+        searched.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        try:
+            account_id = uuid.UUID(search_term)
+        except ValueError:
+            return queryset.none(), False
+        return (
+            queryset.filter(
+                Q(source_account_id=account_id)
+                | Q(destination_account_id=account_id)
+            ),
+            False,
+        )
 
 
-admin.site.register(Bank)
-admin.site.register(TransferRequest)
+@admin.register(ScheduledTransfer)
+class ScheduledTransferAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "source_bank",
+        "source_account_id",
+        "destination_bank",
+        "destination_account_id",
+        "amount",
+        "recurrence",
+        "due_at",
+        "ends_at",
+    )
+    list_select_related = ("source_bank", "destination_bank")
+    list_filter = ("recurrence",)
+    autocomplete_fields = ("source_bank", "destination_bank")
+    paginator = CappedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,103 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
+
+from django.conf import settings
+
+
+class AdmissionController:
+    """Tracks outstanding outbound bank calls and sheds new transfer
+    submissions once too many are in flight
+
+    Counts are kept per process, globally and per bank uuid.
+
+    Parameters
+    ----------
+    max_outstanding : int, optional
+        Maximum outbound calls in flight before submissions are shed
+    max_outstanding_per_bank : int, optional
+        Maximum outbound calls in flight to one bank before submissions
+        involving that bank are shed
+    retry_after : int
+        Seconds clients are told to wait before retrying
+    """
+
+    def __init__(
+        self,
+        max_outstanding: Optional[int] = None,
+        max_outstanding_per_bank: Optional[int] = None,
+        retry_after: int = 5,
+    ) -> None:
+        self.max_outstanding = max_outstanding
+        self.max_outstanding_per_bank = max_outstanding_per_bank
+        self.retry_after = retry_after
+        self._outstanding = 0
+        self._per_bank: Counter = Counter()
+        self._shed = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, bank_id: str) -> Iterator[None]:
+        """Counts an outbound call to a bank while it is in flight"""
+        bank_id = str(bank_id)
+        with self._lock:
+            self._outstanding += 1
+            self._per_bank[bank_id] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._outstanding -= 1
+                self._per_bank[bank_id] -= 1
+                if not self._per_bank[bank_id]:
+                    del self._per_bank[bank_id]
+
+    def admit(self, bank_ids: Iterable[str] = ()) -> Optional[str]:
+        """Checks if a new submission involving the banks can be accepted
+
+        Parameters
+        ----------
+        bank_ids : Iterable[str]
+            Uuids of the banks the submission calls
+
+        Returns
+        -------
+        Optional[str]
+            Reason the submission is shed, None if it is admitted
+        """
+        reason = None
+        with self._lock:
+            if (
+                self.max_outstanding is not None
+                and self._outstanding >= self.max_outstanding
+            ):
+                reason = "Too many bank requests in progress."
+            elif self.max_outstanding_per_bank is not None:
+                for bank_id in bank_ids:
+                    outstanding = self._per_bank.get(str(bank_id), 0)
+                    if outstanding >= self.max_outstanding_per_bank:
+                        reason = f"Bank {bank_id} is busy."
+                        break
+
+            if reason is not None:
+                self._shed += 1
+        return reason
+
+    def state(self) -> dict:
+        """Returns the counters and limits for monitoring"""
+        with self._lock:
+            return {
+                "outstanding": self._outstanding,
+                "outstanding_per_bank": dict(self._per_bank),
+                "shed": self._shed,
+                "max_outstanding": self.max_outstanding,
+                "max_outstanding_per_bank": self.max_outstanding_per_bank,
+            }
+
+
+admission = AdmissionController(
+    max_outstanding=settings.ADMISSION_MAX_OUTSTANDING,
+    max_outstanding_per_bank=settings.ADMISSION_MAX_OUTSTANDING_PER_BANK,
+    retry_after=settings.ADMISSION_RETRY_AFTER,
+)
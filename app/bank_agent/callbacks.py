@@ -0,0 +1,153 @@
+import atexit
+import logging
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from bank_agent.models import ServiceDetail, TransferRequest
+from bank_agent.velocity import velocity_limits
+
+logger = logging.getLogger(__name__)
+
+
+class CallbackBuffer:
+    """Buffers bank settlement notifications and applies them in batches
+
+    Notifications are kept per transfer, the latest one wins, and written
+    in one transaction, one batched update per distinct outcome, once
+    ``max_size`` are pending or ``delay`` seconds after the first pending
+    one, by a flusher thread. A delay of 0 applies every notification
+    immediately. Only transfers whose outcome is still unknown are
+    settled, a completed, failed or reversed transfer is left as is.
+
+    Parameters
+    ----------
+    delay : float
+        Seconds a notification may wait before being applied
+    max_size : int
+        Number of pending notifications applied right away
+    """
+
+    # seconds the flusher thread waits after a failed flush
+    retry_delay = 5
+
+    def __init__(self, delay: float, max_size: int = 1000) -> None:
+        self.delay = delay
+        self.max_size = max_size
+        self._pending: Dict[int, Tuple[bool, str]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def add(self, transfer_id: int, completed: bool, detail: str) -> None:
+        """Queues a notification for a transfer
+
+        Parameters
+        ----------
+        transfer_id : int
+            Transfer request primary key
+        completed : bool
+            Whether the bank settled the transfer
+        detail : str
+            Service detail reported by the bank
+        """
+        with self._lock:
+            self._pending[transfer_id] = (completed, detail)
+            size = len(self._pending)
+
+        if not self.delay or size >= self.max_size:
+            self.flush()
+        else:
+            self._start()
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """Applies every pending notification
+
+        Returns
+        -------
+        int
+            Number of transfers settled
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            # banks report a handful of distinct outcomes, one UPDATE per
+            # outcome is much cheaper than a CASE per row from bulk_update
+            groups: Dict[Tuple[bool, str], List[int]] = {}
+            for transfer_id, outcome in pending.items():
+                groups.setdefault(outcome, []).append(transfer_id)
+
+            # transfers the flush completes, a notification resent after
+            # the flush settled its transfer is ignored
+            newly_completed = []
+            settled = 0
+            try:
+                with transaction.atomic():
+                    for (completed, detail), transfer_ids in groups.items():
+                        detail_id = ServiceDetail.objects.intern(detail)
+                        for offset in range(0, len(transfer_ids), 500):
+                            transfers = TransferRequest.objects.filter(
+                                pk__in=transfer_ids[offset:offset + 500],
+                                completed=None,
+                            )
+                            if completed:
+                                newly_completed.extend(
+                                    transfers.values_list(
+                                        "source_bank_id",
+                                        "source_account_id",
+                                        "amount",
+                                    )
+                                )
+                            settled += transfers.update(
+                                completed=completed, detail_id=detail_id
+                            )
+            except Exception:
+                # keep the notifications for the next flush unless a newer
+                # one arrived meanwhile
+                with self._lock:
+                    pending.update(self._pending)
+                    self._pending = pending
+                raise
+
+            for source in newly_completed:
+                velocity_limits.record(*source)
+            return settled
+
+    def _start(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="callback-flusher", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.delay)
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                # the notifications were kept, retried after a delay
+                logger.exception("Applying bank notifications failed")
+                time.sleep(self.retry_delay)
+                self._wakeup.set()
+
+
+callback_buffer = CallbackBuffer(
+    delay=settings.CALLBACK_FLUSH_DELAY,
+    max_size=settings.CALLBACK_BATCH_SIZE,
+)
@@ -0,0 +1,173 @@
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+from django.db.models import QuerySet
+
+from bank_agent.models import ServiceDetail, TransferRequest
+
+logger = logging.getLogger(__name__)
+
+# service detail of transfers being sent, and of those whose send raised
+SENDING_DETAIL = "Sending, outcome unknown"
+
+
+def shard_by_source_account(
+    transfers: List[TransferRequest],
+) -> List[List[TransferRequest]]:
+    """Groups transfers by source account keeping their relative order
+
+    Parameters
+    ----------
+    transfers : List[TransferRequest]
+        Transfers in dispatch order
+
+    Returns
+    -------
+    List[List[TransferRequest]]
+        One list of transfers per (source bank, source account)
+    """
+    shards: "OrderedDict[Tuple[int, str], List[TransferRequest]]" = (
+        OrderedDict()
+    )
+    for transfer in transfers:
+        key = (transfer.source_bank_id, str(transfer.source_account_id))
+        shards.setdefault(key, []).append(transfer)
+    return list(shards.values())
+
+
+def _dispatch_shard(
+    shard: List[TransferRequest],
+) -> Tuple[List[TransferRequest], Optional[Exception]]:
+    """Sends the transfers of one source account one after the other
+
+    Stops at the first transfer that raises so later debits of the account
+    are not sent out of order, and returns the transfers already sent with
+    the error.
+    """
+    sent = []
+    for transfer in shard:
+        try:
+            transfer.send_request_to_banks(commit=False)
+        except Exception as exc:
+            return sent, exc
+        sent.append(transfer)
+    return sent, None
+
+
+def dispatch_many(
+    queryset: QuerySet,
+    max_workers: int = 8,
+    batch_size: int = 500,
+    raise_errors: bool = True,
+) -> Dict[str, int]:
+    """Sends many transfer requests to the banks in parallel
+
+    Transfers are sharded by source account: the transfers of one account
+    are sent in creation order on a single worker, while unrelated
+    accounts are sent concurrently. Outcomes are written back with
+    ``bulk_update`` in batches as shards finish.
+
+    Every transfer is saved with an unknown outcome before the first bank
+    call, so a transfer whose send raises, or never finishes, keeps an
+    unknown outcome and is not sent again. If a transfer raises, the rest
+    of its account is skipped and left unsent, the other accounts still
+    run and the first error is raised once every outcome has been saved.
+
+    Parameters
+    ----------
+    queryset : QuerySet
+        Transfer requests to send
+    max_workers : int
+        Number of worker threads
+    batch_size : int
+        Number of transfers per ``bulk_update``
+    raise_errors : bool
+        Raises the first error of a transfer when True, logs the errors
+        when False
+
+    Returns
+    -------
+    Dict[str, int]
+        Number of dispatched, completed, failed and unknown outcome
+        transfers, transfers whose send raised are unknown
+    """
+    transfers = list(
+        queryset.select_related("source_bank", "destination_bank").order_by(
+            "created", "id"
+        )
+    )
+    results = {"dispatched": 0, "completed": 0, "failed": 0, "unknown": 0}
+    pending_updates: List[TransferRequest] = []
+    first_error: Optional[Exception] = None
+
+    def update(transfer_ids: List[int], **values) -> None:
+        for offset in range(0, len(transfer_ids), batch_size):
+            TransferRequest.objects.filter(
+                pk__in=transfer_ids[offset:offset + batch_size]
+            ).update(**values)
+
+    def flush() -> None:
+        for transfer in pending_updates:
+            transfer.intern_service_detail()
+        TransferRequest.objects.bulk_update(
+            pending_updates,
+            ["completed", "detail"],
+            batch_size=batch_size,
+        )
+        pending_updates.clear()
+
+    update(
+        [transfer.pk for transfer in transfers],
+        completed=None,
+        detail_id=ServiceDetail.objects.intern(SENDING_DETAIL),
+    )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(_dispatch_shard, shard): shard
+            for shard in shard_by_source_account(transfers)
+        }
+        for future in as_completed(futures):
+            sent, error = future.result()
+            if error is not None:
+                # the transfer that raised keeps its unknown outcome, the
+                # rest of its account was never sent
+                shard = futures[future]
+                failed = shard[len(sent)]
+                results["dispatched"] += 1
+                results["unknown"] += 1
+                update(
+                    [transfer.pk for transfer in shard[len(sent) + 1:]],
+                    completed=False,
+                    detail=None,
+                )
+                if raise_errors:
+                    first_error = first_error or error
+                else:
+                    logger.error(
+                        "Sending transfer %s failed",
+                        failed.pk,
+                        exc_info=error,
+                    )
+
+            for transfer in sent:
+                if transfer.completed is None:
+                    outcome = "unknown"
+                else:
+                    outcome = "completed" if transfer.completed else "failed"
+                results["dispatched"] += 1
+                results[outcome] += 1
+                pending_updates.append(transfer)
+
+            if len(pending_updates) >= batch_size:
+                flush()
+
+    if pending_updates:
+        flush()
+
+    if first_error is not None:
+        raise first_error
+
+    return results
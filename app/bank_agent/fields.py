@@ -0,0 +1,96 @@
+from decimal import Decimal, InvalidOperation
+
+from django import forms
+from django.core import exceptions
+from django.db import models
+
+
+class MinorUnitsField(models.BigIntegerField):
+    """Decimal amount stored as an integer number of minor units
+
+    The column holds ``amount * 10 ** decimal_places`` as a big integer,
+    which is smaller than a decimal column and its indexes and sums
+    exactly. Values are ``Decimal`` in Python, converted when they are
+    written and read, so lookups, ordering and ``Sum`` take and return
+    amounts. Aggregates that change the unit, like ``Avg``, work on minor
+    units.
+
+    Parameters
+    ----------
+    decimal_places : int
+        Number of decimal places of the amounts, amounts with more are
+        rejected rather than rounded
+    max_digits : int
+        Maximum number of digits accepted by the form field
+    """
+
+    description = "Decimal amount stored as integer minor units"
+
+    def __init__(self, *args, decimal_places=2, max_digits=18, **kwargs):
+        self.decimal_places = decimal_places
+        self.max_digits = max_digits
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.decimal_places != 2:
+            kwargs["decimal_places"] = self.decimal_places
+        if self.max_digits != 18:
+            kwargs["max_digits"] = self.max_digits
+        return name, path, args, kwargs
+
+    def to_minor_units(self, value) -> int:
+        """Returns an amount as an integer number of minor units"""
+        minor_units = Decimal(value).scaleb(self.decimal_places)
+        if minor_units != minor_units.to_integral_value():
+            raise ValueError(
+                f"{value} has more than {self.decimal_places} decimal places"
+            )
+        return int(minor_units)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return Decimal(value).scaleb(-self.decimal_places)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, Decimal):
+            return value
+        try:
+            return Decimal(str(value))
+        except InvalidOperation:
+            raise exceptions.ValidationError(
+                self.error_messages["invalid"],
+                code="invalid",
+                params={"value": value},
+            )
+
+    def validate(self, value, model_instance):
+        super().validate(value, model_instance)
+        if value is not None:
+            try:
+                self.to_minor_units(value)
+            except ValueError as exc:
+                raise exceptions.ValidationError(str(exc), code="invalid")
+
+    def get_prep_value(self, value):
+        value = models.Field.get_prep_value(self, value)
+        if value is None:
+            return None
+        try:
+            return self.to_minor_units(value)
+        except (InvalidOperation, TypeError, ValueError) as exc:
+            raise exc.__class__(
+                f"Field '{self.name}' expected an amount but got {value!r}."
+            ) from exc
+
+    def formfield(self, **kwargs):
+        return models.Field.formfield(
+            self,
+            **{
+                "form_class": forms.DecimalField,
+                "max_digits": self.max_digits,
+                "decimal_places": self.decimal_places,
+                **kwargs,
+            },
+        )
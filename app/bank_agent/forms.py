@@ -1,6 +1,40 @@
+import datetime
+from typing import Set, Tuple
+
 from django import forms
+from django.db.models import QuerySet
+from django.urls import reverse_lazy
+from django.utils import timezone
+
+from bank_agent.models import Bank, TransferRequest
+
+
+class BankAutocompleteWidget(forms.Widget):
+    """Bank picker backed by the bank lookup endpoint
+
+    Only the selected bank is rendered, matching banks are fetched while
+    typing, so the page size does not grow with the bank directory.
+    """
 
-from bank_agent.models import TransferRequest
+    template_name = "bank_agent/widgets/bank_autocomplete.html"
+    lookup_url = reverse_lazy("bank_agent:bank_lookup")
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        label = ""
+        try:
+            bank_id = int(value) if value else None
+        except (TypeError, ValueError):
+            # submitted values are rendered before they are validated
+            bank_id = None
+        if bank_id is not None:
+            bank = Bank.objects.filter(pk=bank_id).values("name", "uuid")
+            bank = bank.first()
+            if bank:
+                label = f"{bank['name']} ({bank['uuid']})"
+        context["widget"]["label"] = label
+        context["widget"]["lookup_url"] = self.lookup_url
+        return context
 
 
 class TransferRequestForm(forms.ModelForm):
@@ -15,3 +49,131 @@ class TransferRequestForm(forms.ModelForm):
             "amount",
             "info",
         )
+        widgets = {
+            "source_bank": BankAutocompleteWidget,
+            "destination_bank": BankAutocompleteWidget,
+        }
+
+
+class TransferRequestFilterForm(forms.Form):
+    """Filters of the transfer request history
+
+    Every filter is served by one of the ``TransferRequest`` indexes, and
+    only the orderings the chosen filters can read from that index are
+    allowed, see ``orderings``.
+    """
+
+    COMPLETED = "completed"
+    FAILED = "failed"
+    UNKNOWN = "unknown"
+    STATUS_CHOICES = [
+        ("", "Any"),
+        (COMPLETED, "Completed"),
+        (FAILED, "Failed"),
+        (UNKNOWN, "Unknown outcome"),
+    ]
+
+    # one field per side, an OR of both sides is read from two indexes
+    # and sorted afterwards
+    source_bank = forms.ModelChoiceField(
+        queryset=Bank.objects.all(),
+        required=False,
+        widget=BankAutocompleteWidget,
+    )
+    destination_bank = forms.ModelChoiceField(
+        queryset=Bank.objects.all(),
+        required=False,
+        widget=BankAutocompleteWidget,
+    )
+    source_account = forms.UUIDField(required=False)
+    destination_account = forms.UUIDField(required=False)
+    status = forms.ChoiceField(choices=STATUS_CHOICES, required=False)
+    # bounded like TransferRequest.amount, larger amounts do not fit the
+    # integer column
+    amount_min = forms.DecimalField(
+        required=False, decimal_places=2, max_digits=18
+    )
+    amount_max = forms.DecimalField(
+        required=False, decimal_places=2, max_digits=18
+    )
+    date_from = forms.DateField(required=False)
+    date_to = forms.DateField(required=False)
+
+    def __init__(self, *args, **kwargs) -> None:
+        # rendered on the page of the transfer form, whose bank pickers
+        # use the default ids
+        kwargs.setdefault("auto_id", "id_filter_%s")
+        super().__init__(*args, **kwargs)
+
+    def filtered_fields(self) -> Set[str]:
+        """Names of the fields with a valid filter"""
+        data = self.cleaned_data if self.is_valid() else {}
+        return {
+            name for name, value in data.items() if value not in (None, "")
+        }
+
+    def orderings(self) -> Tuple[str, ...]:
+        """Columns the filtered history can be ordered by
+
+        Every other filter reads the ``(<filter>, created)`` indexes, which
+        only return rows in ``created`` order, and the amount range reads
+        the ``(amount, created)`` index, which returns rows in ``amount``
+        order.
+        """
+        fields = self.filtered_fields()
+        if not fields:
+            return ("amount", "created")
+        if fields <= {"amount_min", "amount_max"}:
+            return ("amount",)
+        return ("created",)
+
+    def filter(self, queryset: QuerySet) -> QuerySet:
+        """Applies the valid filters to a transfer request queryset"""
+        data = self.cleaned_data if self.is_valid() else {}
+
+        if data.get("source_bank"):
+            queryset = queryset.filter(source_bank=data["source_bank"])
+        if data.get("destination_bank"):
+            queryset = queryset.filter(
+                destination_bank=data["destination_bank"]
+            )
+        if data.get("source_account"):
+            queryset = queryset.filter(
+                source_account_id=data["source_account"]
+            )
+        if data.get("destination_account"):
+            queryset = queryset.filter(
+                destination_account_id=data["destination_account"]
+            )
+        if data.get("status") == self.UNKNOWN:
+            queryset = queryset.filter(completed=None)
+        elif data.get("status"):
+            # completed=True compiles to a bare column test, which can not
+            # use the index, IN compares the column
+            queryset = queryset.filter(
+                completed__in=[data["status"] == self.COMPLETED]
+            )
+        if data.get("amount_min") is not None:
+            queryset = queryset.filter(amount__gte=data["amount_min"])
+        if data.get("amount_max") is not None:
+            queryset = queryset.filter(amount__lte=data["amount_max"])
+        # compare created directly, a __date lookup can not use the index
+        if data.get("date_from"):
+            queryset = queryset.filter(
+                created__gte=self.start_of_day(data["date_from"])
+            )
+        if data.get("date_to"):
+            queryset = queryset.filter(
+                created__lt=self.start_of_day(
+                    data["date_to"] + datetime.timedelta(days=1)
+                )
+            )
+        if "created" not in self.orderings():
+            queryset = queryset.order_by("amount")
+        return queryset
+
+    @staticmethod
+    def start_of_day(date: datetime.date) -> datetime.datetime:
+        return timezone.make_aware(
+            datetime.datetime.combine(date, datetime.time())
+        )
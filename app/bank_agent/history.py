@@ -0,0 +1,129 @@
+"""Fast rendering of the transfer history table body.
+
+Rendering a history page through the django_tables2 templates builds a
+model instance, a bound row and a template context for every cell. The
+rows of the current page are fetched here as tuples of the displayed
+columns only and formatted in a single loop instead, producing the same
+markup as the default ``table.tbody`` block.
+"""
+from html import escape as html_escape
+from typing import Callable, Dict, Tuple
+
+from django.conf import settings
+from django.utils import dateformat, numberformat, timezone
+from django.utils.formats import get_format
+from django.utils.html import conditional_escape
+from django.utils.safestring import SafeString, mark_safe
+from django.utils.translation import get_language
+
+
+# column name: (queried field, kind of value)
+HISTORY_CELLS: Dict[str, Tuple[str, str]] = {
+    "id": ("id", "number"),
+    "source_bank": ("source_bank__name", "text"),
+    "source_account_id": ("source_account_id", "text"),
+    "destination_bank": ("destination_bank__name", "text"),
+    "destination_account_id": ("destination_account_id", "text"),
+    "amount": ("amount", "number"),
+    "info": ("info", "text"),
+    "service_detail": ("detail__text", "text"),
+    "completed": ("completed", "boolean"),
+    "created": ("created", "datetime"),
+}
+
+
+def compile_formatters() -> Dict[str, Callable]:
+    """Returns the formatters of every kind of value, with the formats
+    of the active language and time zone resolved once
+
+    They render values like the ``{{ cell }}`` of the django_tables2
+    templates, ``localize`` for numbers and the ``date`` filter with
+    ``SHORT_DATETIME_FORMAT`` for datetimes.
+    """
+    lang = get_language() if settings.USE_L10N else None
+    decimal_sep = get_format("DECIMAL_SEPARATOR", lang)
+    grouping = get_format("NUMBER_GROUPING", lang)
+    thousand_sep = get_format("THOUSAND_SEPARATOR", lang)
+    datetime_format = get_format("SHORT_DATETIME_FORMAT", lang)
+    tz = timezone.get_current_timezone() if settings.USE_TZ else None
+
+    # django.utils.html.escape is html.escape behind a lazy string check,
+    # the unwrapped one is called directly in the row loop
+    def text(value) -> str:
+        return html_escape(str(value))
+
+    def number(value) -> str:
+        return html_escape(
+            numberformat.format(
+                value, decimal_sep, None, grouping, thousand_sep
+            )
+        )
+
+    def boolean(value) -> str:
+        if value:
+            return '<span class="true">✔</span>'
+        return '<span class="false">✘</span>'
+
+    def datetime(value) -> str:
+        if tz is not None and timezone.is_aware(value):
+            value = timezone.localtime(value, tz)
+        return html_escape(dateformat.format(value, datetime_format))
+
+    return {
+        "number": number,
+        "text": text,
+        "boolean": boolean,
+        "datetime": datetime,
+    }
+
+
+def render_history_rows(table) -> SafeString:
+    """Renders the rows of the current page of a transfer history table
+
+    Parameters
+    ----------
+    table : TransferRequestTable
+        Configured, and usually paginated, table over a transfer request
+        queryset
+
+    Returns
+    -------
+    SafeString
+        ``<tr>`` elements of the page, or the empty text row
+    """
+    columns = list(table.columns)
+    rows = table.paginated_rows
+    queryset = rows.data if hasattr(table, "page") else rows.data.data
+
+    formatters = compile_formatters()
+    cells = []
+    for column in columns:
+        field, kind = HISTORY_CELLS[column.name]
+        cells.append(
+            (
+                formatters[kind],
+                f"<td {column.attrs['td'].as_html()}>",
+                conditional_escape(column.default),
+            )
+        )
+    empty_values = (None, "")
+
+    html = []
+    append = html.append
+    records = queryset.values_list(
+        *(HISTORY_CELLS[column.name][0] for column in columns)
+    )
+    for counter, values in enumerate(records):
+        append('<tr class="odd">' if counter % 2 else '<tr class="even">')
+        for (formatter, td, default), value in zip(cells, values):
+            append(td)
+            append(default if value in empty_values else formatter(value))
+            append("</td>")
+        append("</tr>")
+
+    if not html and table.empty_text:
+        html.append(
+            f'<tr><td colspan="{len(columns)}">'
+            f"{conditional_escape(table.empty_text)}</td></tr>"
+        )
+    return mark_safe("".join(html))
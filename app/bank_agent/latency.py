@@ -0,0 +1,125 @@
+import threading
+from collections import deque
+from typing import Deque, Dict, Tuple
+
+from django.conf import settings
+
+
+class LatencyEstimator:
+    """Per bank and operation timeouts derived from recent latencies
+
+    Keeps the last ``window`` latencies of every (bank, operation) and
+    derives the timeout as the ``percentile`` latency times ``multiplier``,
+    bounded by ``floor`` and ``ceiling``. Until ``min_samples`` latencies
+    are known the ``default`` timeout is used. Estimates are per process.
+
+    Parameters
+    ----------
+    percentile : float
+        Latency percentile the timeout is based on, between 0 and 1
+    multiplier : float
+        Factor applied to the percentile latency
+    floor : float
+        Minimum timeout in seconds
+    ceiling : float
+        Maximum timeout in seconds
+    default : float
+        Timeout in seconds while too few latencies are known
+    window : int
+        Number of latencies kept per bank and operation
+    min_samples : int
+        Number of latencies needed before the estimate is used
+    """
+
+    # the timeout is recomputed every this many latencies
+    refresh_every = 10
+
+    def __init__(
+        self,
+        percentile: float = 0.99,
+        multiplier: float = 3.0,
+        floor: float = 0.5,
+        ceiling: float = 30.0,
+        default: float = 10.0,
+        window: int = 500,
+        min_samples: int = 20,
+    ) -> None:
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.floor = floor
+        self.ceiling = ceiling
+        self.default = min(max(default, floor), ceiling)
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+        self._timeouts: Dict[Tuple[str, str], float] = {}
+        self._recorded: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def timeout(self, bank_id: str, operation: str) -> float:
+        """Returns the timeout in seconds for a call to a bank
+
+        Parameters
+        ----------
+        bank_id : str
+            Bank uuid
+        operation : str
+            Bank operation, ``transfer``, ``retire`` or ``add``
+        """
+        return self._timeouts.get((str(bank_id), operation), self.default)
+
+    def record(self, bank_id: str, operation: str, latency: float) -> None:
+        """Adds the latency of a call, timed out calls are recorded with
+        their timeout
+
+        Parameters
+        ----------
+        bank_id : str
+            Bank uuid
+        operation : str
+            Bank operation
+        latency : float
+            Call duration in seconds
+        """
+        key = (str(bank_id), operation)
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(latency)
+            recorded = self._recorded[key] = self._recorded.get(key, 0) + 1
+
+            if (
+                recorded >= self.min_samples
+                and (recorded - self.min_samples) % self.refresh_every == 0
+            ):
+                self._timeouts[key] = self._estimate(samples)
+
+    def _estimate(self, samples: Deque[float]) -> float:
+        ordered = sorted(samples)
+        index = min(int(len(ordered) * self.percentile), len(ordered) - 1)
+        timeout = ordered[index] * self.multiplier
+        return min(max(timeout, self.floor), self.ceiling)
+
+    def state(self) -> Dict[str, float]:
+        """Returns the current timeouts keyed on ``<bank>:<operation>``"""
+        return {
+            f"{bank_id}:{operation}": timeout
+            for (bank_id, operation), timeout in self._timeouts.items()
+        }
+
+    def clear(self) -> None:
+        """Drops every latency and timeout"""
+        with self._lock:
+            self._samples = {}
+            self._timeouts = {}
+            self._recorded = {}
+
+
+latency_estimator = LatencyEstimator(
+    percentile=settings.BANK_TIMEOUT_PERCENTILE,
+    multiplier=settings.BANK_TIMEOUT_MULTIPLIER,
+    floor=settings.BANK_TIMEOUT_FLOOR,
+    ceiling=settings.BANK_TIMEOUT_CEILING,
+    default=settings.BANK_TIMEOUT_DEFAULT,
+)
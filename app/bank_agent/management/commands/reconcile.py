@@ -0,0 +1,131 @@
+import datetime
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bank_agent.models import TransferRequest
+from bank_agent.reconciliation import (
+    StatementError,
+    expected_legs,
+    read_statement,
+    reconcile,
+)
+
+
+class Command(BaseCommand):
+    """Reconciles transfer requests against bank statement exports"""
+
+    help = (
+        "Matches bank statement exports (CSV or JSONL) against transfer "
+        "requests and writes a JSONL report of matched items, missing legs, "
+        "amount mismatches, orphan reversals and unexpected lines."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("statements", nargs="+")
+        parser.add_argument("--output", required=True)
+        parser.add_argument(
+            "--from",
+            dest="date_from",
+            type=datetime.date.fromisoformat,
+            help="first booking date, defaults to the earliest statement date",
+        )
+        parser.add_argument(
+            "--to",
+            dest="date_to",
+            type=datetime.date.fromisoformat,
+            help=(
+                "last booking date, defaults to the latest statement date or "
+                "to today without statement lines"
+            ),
+        )
+        parser.add_argument("--partitions", type=int, default=64)
+        parser.add_argument("--workers", type=int, default=None)
+
+    def handle(self, *args, **options):
+        dates = set()
+
+        def statements():
+            for path in options["statements"]:
+                for line in read_statement(path):
+                    dates.add(line["date"])
+                    yield line
+
+        def local_legs():
+            if not dates and not options["date_from"]:
+                return
+            # without statement dates --from alone reconciles up to today
+            date_from = options["date_from"] or datetime.date.fromisoformat(
+                min(dates)
+            )
+            date_to = options["date_to"] or (
+                datetime.date.fromisoformat(max(dates))
+                if dates
+                else datetime.datetime.now(datetime.timezone.utc).date()
+            )
+            transfers = (
+                TransferRequest.objects.filter(
+                    created__gte=datetime.datetime.combine(
+                        date_from, datetime.time(), datetime.timezone.utc
+                    ),
+                    created__lt=datetime.datetime.combine(
+                        date_to + datetime.timedelta(days=1),
+                        datetime.time(),
+                        datetime.timezone.utc,
+                    ),
+                )
+                .order_by()
+                .values_list(
+                    "id",
+                    "source_bank__uuid",
+                    "source_account_id",
+                    "destination_bank__uuid",
+                    "destination_account_id",
+                    "amount",
+                    "info",
+                    "completed",
+                    "created",
+                )
+                .iterator(chunk_size=5000)
+            )
+            for transfer in transfers:
+                (
+                    transfer_id,
+                    source_bank,
+                    source_account,
+                    destination_bank,
+                    destination_account,
+                    amount,
+                    info,
+                    completed,
+                    created,
+                ) = transfer
+                yield from expected_legs(
+                    transfer_id,
+                    str(source_bank),
+                    str(source_account),
+                    str(destination_bank),
+                    str(destination_account),
+                    amount,
+                    info,
+                    completed,
+                    created.astimezone(datetime.timezone.utc)
+                    .date()
+                    .isoformat(),
+                )
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            try:
+                totals = reconcile(
+                    statements(),
+                    local_legs(),
+                    work_dir,
+                    options["output"],
+                    partitions=options["partitions"],
+                    workers=options["workers"],
+                )
+            except (OSError, StatementError) as exc:
+                raise CommandError(exc)
+
+        for status, count in totals.items():
+            self.stdout.write(f"{status}: {count}")
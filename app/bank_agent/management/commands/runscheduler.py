@@ -0,0 +1,46 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from bank_agent.scheduler import Scheduler
+from bank_agent.velocity import velocity_limits
+
+
+class Command(BaseCommand):
+    """Sends scheduled and recurring transfers when they are due"""
+
+    help = (
+        "Expands due scheduled transfers into transfer requests and sends "
+        "them, catching up on missed occurrences first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument(
+            "--horizon",
+            type=int,
+            default=300,
+            help="seconds ahead due schedules are loaded in memory",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="only catch up on due schedules and exit",
+        )
+
+    def handle(self, *args, **options):
+        velocity_limits.rebuild()
+        scheduler = Scheduler(
+            batch_size=options["batch_size"],
+            horizon=datetime.timedelta(seconds=options["horizon"]),
+        )
+
+        if options["once"]:
+            sent = scheduler.catch_up()
+            self.stdout.write(f"Sent {sent} scheduled transfers")
+            return
+
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.25 on 2026-10-19 04:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_agent', '0005_auto_20220323_0112'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bank',
+            name='name',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='transferrequest',
+            name='completed',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AlterField(
+            model_name='transferrequest',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='transferrequest',
+            name='destination_account_id',
+            field=models.UUIDField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='transferrequest',
+            name='source_account_id',
+            field=models.UUIDField(db_index=True),
+        ),
+    ]
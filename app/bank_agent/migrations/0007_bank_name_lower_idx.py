@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-19 04:51
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_agent', '0006_add_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bank',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='bank_name_lower_idx'),
+        ),
+    ]
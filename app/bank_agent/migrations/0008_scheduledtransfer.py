@@ -0,0 +1,34 @@
+# Generated by Django 3.2.25 on 2026-10-19 04:55
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_agent', '0007_bank_name_lower_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledTransfer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_account_id', models.UUIDField()),
+                ('destination_account_id', models.UUIDField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=18, validators=[django.core.validators.MinValueValidator(1)])),
+                ('info', models.CharField(max_length=255)),
+                ('recurrence', models.CharField(choices=[('once', 'Once'), ('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly')], default='once', max_length=10)),
+                ('due_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('ends_at', models.DateTimeField(blank=True, null=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('destination_bank', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='destination_bank_scheduled_transfer', to='bank_agent.bank')),
+                ('source_bank', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='source_bank_scheduled_transfer', to='bank_agent.bank')),
+            ],
+            options={
+                'ordering': ['due_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 3.2.25 on 2026-10-19 05:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_agent', '0008_scheduledtransfer'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transferrequest',
+            name='completed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='transferrequest',
+            name='destination_account_id',
+            field=models.UUIDField(),
+        ),
+        migrations.AlterField(
+            model_name='transferrequest',
+            name='source_account_id',
+            field=models.UUIDField(),
+        ),
+        migrations.AddIndex(
+            model_name='transferrequest',
+            index=models.Index(fields=['source_bank', 'created'], name='transfer_src_bank_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transferrequest',
+            index=models.Index(fields=['destination_bank', 'created'], name='transfer_dst_bank_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transferrequest',
+            index=models.Index(fields=['source_account_id', 'created'], name='transfer_src_acct_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transferrequest',
+            index=models.Index(fields=['destination_account_id', 'created'], name='transfer_dst_acct_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transferrequest',
+            index=models.Index(fields=['completed', 'created'], name='transfer_completed_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transferrequest',
+            index=models.Index(fields=['amount', 'created'], name='transfer_amount_created_idx'),
+        ),
+    ]
@@ -0,0 +1,135 @@
+# Generated by Django 3.2.25 on 2026-10-19 05:08
+
+import bank_agent.fields
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F, OuterRef, Subquery
+from django.db.models.functions import Cast, Round
+import django.db.models.deletion
+
+
+def intern_service_details(apps, schema_editor):
+    TransferRequest = apps.get_model("bank_agent", "TransferRequest")
+    ServiceDetail = apps.get_model("bank_agent", "ServiceDetail")
+
+    texts = (
+        TransferRequest.objects.exclude(service_detail=None)
+        .order_by()
+        .values_list("service_detail", flat=True)
+        .distinct()
+    )
+    ServiceDetail.objects.bulk_create(
+        [ServiceDetail(text=text) for text in texts.iterator()],
+        batch_size=500,
+    )
+    TransferRequest.objects.exclude(service_detail=None).update(
+        detail=Subquery(
+            ServiceDetail.objects.filter(
+                text=OuterRef("service_detail")
+            ).values("pk")[:1]
+        )
+    )
+
+
+def restore_service_details(apps, schema_editor):
+    TransferRequest = apps.get_model("bank_agent", "TransferRequest")
+    ServiceDetail = apps.get_model("bank_agent", "ServiceDetail")
+
+    TransferRequest.objects.exclude(detail=None).update(
+        service_detail=Subquery(
+            ServiceDetail.objects.filter(pk=OuterRef("detail_id")).values(
+                "text"
+            )[:1]
+        )
+    )
+
+
+def amounts_to_minor_units(apps, schema_editor):
+    TransferRequest = apps.get_model("bank_agent", "TransferRequest")
+
+    # rounded because SQLite keeps decimals as floating point numbers
+    TransferRequest.objects.update(
+        amount_minor=Cast(
+            Round(
+                ExpressionWrapper(
+                    F("amount") * 100, output_field=models.DecimalField()
+                )
+            ),
+            models.BigIntegerField(),
+        )
+    )
+
+
+def amounts_from_minor_units(apps, schema_editor):
+    TransferRequest = apps.get_model("bank_agent", "TransferRequest")
+
+    batch = []
+    transfers = TransferRequest.objects.only("pk", "amount_minor")
+    for transfer in transfers.iterator(chunk_size=2000):
+        transfer.amount = transfer.amount_minor
+        batch.append(transfer)
+        if len(batch) == 2000:
+            TransferRequest.objects.bulk_update(batch, ["amount"])
+            batch = []
+    TransferRequest.objects.bulk_update(batch, ["amount"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_agent', '0009_history_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceDetail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField(unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='transferrequest',
+            name='detail',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='bank_agent.servicedetail', verbose_name='service detail'),
+        ),
+        migrations.RunPython(intern_service_details, restore_service_details),
+        migrations.RemoveField(
+            model_name='transferrequest',
+            name='service_detail',
+        ),
+        migrations.RemoveIndex(
+            model_name='transferrequest',
+            name='transfer_amount_created_idx',
+        ),
+        migrations.AddField(
+            model_name='transferrequest',
+            name='amount_minor',
+            field=bank_agent.fields.MinorUnitsField(null=True),
+        ),
+        # nullable so that the column can be added back when reversing
+        migrations.AlterField(
+            model_name='transferrequest',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=18, null=True, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.RunPython(amounts_to_minor_units, amounts_from_minor_units),
+        migrations.RemoveField(
+            model_name='transferrequest',
+            name='amount',
+        ),
+        migrations.RenameField(
+            model_name='transferrequest',
+            old_name='amount_minor',
+            new_name='amount',
+        ),
+        migrations.AlterField(
+            model_name='transferrequest',
+            name='amount',
+            field=bank_agent.fields.MinorUnitsField(validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddIndex(
+            model_name='transferrequest',
+            index=models.Index(fields=['amount', 'created'], name='transfer_amount_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-19 05:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_agent', '0010_compact_transfer_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bank',
+            name='supports_batch',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.25 on 2026-10-19 07:12
+
+from django.db import migrations, models
+
+
+def lower_bank_names(apps, schema_editor):
+    Bank = apps.get_model("bank_agent", "Bank")
+
+    banks = list(Bank.objects.only("pk", "name"))
+    for bank in banks:
+        bank.name_lower = bank.name.lower()
+    Bank.objects.bulk_update(banks, ["name_lower"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_agent', '0011_bank_supports_batch'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='bank',
+            name='bank_name_lower_idx',
+        ),
+        migrations.AddField(
+            model_name='bank',
+            name='name_lower',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(lower_bank_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.25 on 2026-10-19 05:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_agent', '0012_bank_name_lower'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transferrequest',
+            name='schedule',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transfer_requests', to='bank_agent.scheduledtransfer'),
+        ),
+    ]
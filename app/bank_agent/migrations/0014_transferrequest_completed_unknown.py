@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-19 05:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_agent', '0013_transferrequest_schedule'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transferrequest',
+            name='completed',
+            field=models.BooleanField(default=False, null=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.25 on 2026-10-19 05:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_agent', '0014_transferrequest_completed_unknown'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transferrequest',
+            name='destination_bank',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='destination_bank_transfer_request', to='bank_agent.bank'),
+        ),
+        migrations.AlterField(
+            model_name='transferrequest',
+            name='source_bank',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='source_bank_transfer_request', to='bank_agent.bank'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-19 06:31
+
+from django.db import migrations, models
+
+
+def start_at_due_at(apps, schema_editor):
+    ScheduledTransfer = apps.get_model("bank_agent", "ScheduledTransfer")
+
+    ScheduledTransfer.objects.update(starts_at=models.F("due_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_agent', '0015_drop_bank_fk_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scheduledtransfer',
+            name='starts_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(start_at_due_at, migrations.RunPython.noop),
+    ]
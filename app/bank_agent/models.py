@@ -1,49 +1,175 @@
-from typing import Tuple
-from django.db import models
+import calendar
+import datetime
+import threading
+from decimal import Decimal
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
 
-from bank_agent.services import (
-    # intra_bank_transfer_request,
-    # retire_fund_request,
-    # add_fund_request,
-    BankAppAPIClient,
-)
+from bank_agent.account_cache import invalid_accounts
+from bank_agent.fields import MinorUnitsField
+from bank_agent.services import OUTCOME_UNKNOWN
+from bank_agent.settlement import settlement_batcher
+from bank_agent.velocity import velocity_limits
+
+if TYPE_CHECKING:
+    # the client (and ``requests`` with it) is imported on first use so
+    # that loading the models stays cheap for commands that never call
+    # a bank
+    from bank_agent.services import BankAppAPIClient
 
 
 class Bank(models.Model):
     """Bank model with url details"""
 
-    name = models.CharField(max_length=255)
+    name = models.CharField(max_length=255, db_index=True)
+    # lowercased in Python for the case insensitive prefix search in the
+    # bank lookup, the database lower() only folds ASCII letters
+    name_lower = models.CharField(
+        max_length=255, db_index=True, editable=False
+    )
     uuid = models.UUIDField(unique=True)
     token = models.CharField(max_length=255)
     url = models.URLField()
+    # accepts batched retire and add operations, see
+    # BankAppAPIClient.batch_fund_request
+    supports_batch = models.BooleanField(default=False)
 
     def __str__(self) -> str:
         return self.name
 
+    def save(self, *args, **kwargs) -> None:
+        self.name_lower = self.name.lower()
+        super().save(*args, **kwargs)
+
+    def get_client(self) -> "BankAppAPIClient":
+        """Returns an API client for the bank"""
+        from bank_agent.services import BankAppAPIClient
+
+        return BankAppAPIClient(
+            self.token,
+            self.url,
+            str(self.uuid),
+            self.name,
+        )
+
+
+class ServiceDetailManager(models.Manager):
+    """Interns service detail messages and caches them per process"""
+
+    # messages kept in memory, the cache is dropped when it is full
+    cache_size = 10_000
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._ids: Dict[str, int] = {}
+        self._texts: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def intern(self, text: Optional[str]) -> Optional[int]:
+        """Returns the id of a message, storing it on first use
+
+        Parameters
+        ----------
+        text : Optional[str]
+            Service detail message
+
+        Returns
+        -------
+        Optional[int]
+            ServiceDetail primary key, None for no message
+        """
+        if text is None:
+            return None
+        text = str(text)
+
+        detail_id = self._ids.get(text)
+        if detail_id is None:
+            detail_id = self.get_or_create(text=text)[0].pk
+            self._remember(detail_id, text)
+        return detail_id
+
+    def text(self, detail_id: Optional[int]) -> Optional[str]:
+        """Returns the message of a ServiceDetail primary key"""
+        if detail_id is None:
+            return None
+
+        text = self._texts.get(detail_id)
+        if text is None:
+            text = self.get(pk=detail_id).text
+            self._remember(detail_id, text)
+        return text
+
+    def _remember(self, detail_id: int, text: str) -> None:
+        def remember() -> None:
+            with self._lock:
+                if len(self._ids) >= self.cache_size:
+                    self._ids, self._texts = {}, {}
+                self._ids[text] = detail_id
+                self._texts[detail_id] = text
+
+        # a message created in a transaction that is rolled back must not
+        # be cached, its id may be reused for another message
+        transaction.on_commit(remember, using=self.db)
+
+
+class ServiceDetail(models.Model):
+    """Distinct message returned for transfer requests, stored once and
+    referenced by every transfer request it was returned for"""
+
+    text = models.TextField(unique=True)
+
+    objects = ServiceDetailManager()
+
+    def __str__(self) -> str:
+        return self.text
+
 
 class TransferRequest(models.Model):
     """Transfer Request Model to store transfer requests made"""
 
+    # the bank foreign keys are indexed by the (<bank>, created) indexes
     source_bank: Bank = models.ForeignKey(
         Bank,
         on_delete=models.CASCADE,
         related_name="source_bank_transfer_request",
+        db_index=False,
     )
     source_account_id = models.UUIDField()
     destination_bank: Bank = models.ForeignKey(
         Bank,
         on_delete=models.CASCADE,
         related_name="destination_bank_transfer_request",
+        db_index=False,
     )
     destination_account_id = models.UUIDField()
-    amount = models.DecimalField(
+    # integer minor units in the database, Decimal in Python
+    amount = MinorUnitsField(
         decimal_places=2, max_digits=18, validators=[MinValueValidator(1)]
     )
     info = models.CharField(max_length=255)
-    service_detail = models.TextField(blank=True, null=True)
-    completed = models.BooleanField(default=False)
-    created = models.DateTimeField(auto_now_add=True)
+    # banks return a handful of distinct messages, they are stored once,
+    # use service_detail to read and set the message
+    detail = models.ForeignKey(
+        ServiceDetail,
+        on_delete=models.PROTECT,
+        blank=True,
+        null=True,
+        related_name="+",
+        verbose_name="service detail",
+    )
+    # None while the outcome is unknown, a bank call timed out after it
+    # was sent, until a bank notification or reconciliation settles it
+    completed = models.BooleanField(default=False, null=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    # schedule the transfer request is an occurrence of
+    schedule = models.ForeignKey(
+        "ScheduledTransfer",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="transfer_requests",
+    )
 
     def __str__(self) -> str:
         return (
@@ -51,37 +177,138 @@ class TransferRequest(models.Model):
             f"to {self.destination_account_id}"
         )
 
+    @property
+    def service_detail(self) -> Optional[str]:
+        """Message returned for the transfer request"""
+        if "_service_detail" in self.__dict__:
+            return self.__dict__["_service_detail"]
+        return ServiceDetail.objects.text(self.detail_id)
+
+    @service_detail.setter
+    def service_detail(self, text: Optional[str]) -> None:
+        # interned when saved, so that transfers sent from worker threads
+        # do not write to the database
+        self.__dict__["_service_detail"] = text
+
+    def intern_service_detail(self) -> None:
+        """Points detail at the message set through service_detail, to be
+        called before saving without ``save``, e.g. with ``bulk_update``"""
+        if "_service_detail" in self.__dict__:
+            self.detail_id = ServiceDetail.objects.intern(
+                self.__dict__.pop("_service_detail")
+            )
+
+    def save(self, *args, **kwargs) -> None:
+        self.intern_service_detail()
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ["-created"]
+        # back the history filters and orderings, every filter is the
+        # leading column followed by created for the default ordering
+        indexes = [
+            models.Index(
+                fields=["source_bank", "created"],
+                name="transfer_src_bank_created_idx",
+            ),
+            models.Index(
+                fields=["destination_bank", "created"],
+                name="transfer_dst_bank_created_idx",
+            ),
+            models.Index(
+                fields=["source_account_id", "created"],
+                name="transfer_src_acct_created_idx",
+            ),
+            models.Index(
+                fields=["destination_account_id", "created"],
+                name="transfer_dst_acct_created_idx",
+            ),
+            models.Index(
+                fields=["completed", "created"],
+                name="transfer_completed_created_idx",
+            ),
+            models.Index(
+                fields=["amount", "created"],
+                name="transfer_amount_created_idx",
+            ),
+        ]
+
+    def send_request_to_banks(self, commit: bool = True) -> None:
+        """sends request to banks
+
+        Parameters
+        ----------
+        commit : bool
+            Saves the outcome when True, callers batching their writes
+            pass False and save the transfer themselves
+        """
 
-    def send_request_to_banks(self) -> None:
-        """sends request to banks"""
+        known_invalid_detail = self.__known_invalid_account_detail()
 
+        if known_invalid_detail is not None:
+            # rejected locally, the bank already reported the account
+            self.service_detail = known_invalid_detail
+
+        else:
+            # reserves the transfer in the counters of the source account
+            velocity_detail = velocity_limits.check(
+                self.source_bank_id, self.source_account_id, self.amount
+            )
+
+            if velocity_detail is not None:
+                # rejected locally, too many transfers from the account
+                self.service_detail = velocity_detail
+
+            else:
+                try:
+                    self.__send()
+                finally:
+                    if not self.completed:
+                        velocity_limits.release(
+                            self.source_bank_id,
+                            self.source_account_id,
+                            self.amount,
+                        )
+
+        if commit:
+            self.save()
+
+    def __send(self) -> None:
+        """Sends the transfer to the banks and sets its outcome"""
         if self.source_bank == self.destination_bank:
             status_code, response_detail = self.__make_intrabank_transfer()
 
-            if status_code == 201:
-                # successful transfer
-                self.completed = True
-            self.service_detail = response_detail
+        elif settlement_batcher.enabled and (
+            self.source_bank.supports_batch
+            or self.destination_bank.supports_batch
+        ):
+            # settled with the other transfers between the two banks
+            status_code, response_detail = settlement_batcher.settle(self)
 
         else:
             status_code, response_detail = self.__make_interbank_transfer()
 
-            if status_code == 201:
-                # successful transfer
-                self.completed = True
-            self.service_detail = response_detail
-        self.save()
+        if status_code == 201:
+            # successful transfer
+            self.completed = True
+        elif status_code == OUTCOME_UNKNOWN:
+            # the bank may have moved the funds, neither completed nor
+            # failed
+            self.completed = None
+        self.service_detail = response_detail
+
+    def __known_invalid_account_detail(self) -> Optional[str]:
+        """Returns the cached bank message if either account is known to
+        be invalid"""
+        return invalid_accounts.get(
+            self.source_bank.uuid, self.source_account_id
+        ) or invalid_accounts.get(
+            self.destination_bank.uuid, self.destination_account_id
+        )
 
     def __make_intrabank_transfer(self) -> Tuple[int, str]:
         """Makes an intra-bank transfer from source to destination account"""
-        transfer_bank_service = BankAppAPIClient(
-            self.source_bank.token,
-            self.source_bank.url,
-            str(self.source_bank.uuid),
-            self.source_bank.name,
-        )
+        transfer_bank_service = self.source_bank.get_client()
 
         # intra bank transfer
         return transfer_bank_service.intra_bank_transfer_request(
@@ -93,19 +320,8 @@ class TransferRequest(models.Model):
 
     def __make_interbank_transfer(self) -> Tuple[int, str]:
         """Makes an inter-bank transfer from source to destination account"""
-        source_bank_service = BankAppAPIClient(
-            self.source_bank.token,
-            self.source_bank.url,
-            str(self.source_bank.uuid),
-            self.source_bank.name,
-        )
-
-        destination_bank_service = BankAppAPIClient(
-            self.destination_bank.token,
-            self.destination_bank.url,
-            str(self.destination_bank.uuid),
-            self.destination_bank.name,
-        )
+        source_bank_service = self.source_bank.get_client()
+        destination_bank_service = self.destination_bank.get_client()
 
         # retire fund from source account
         status_code, response_detail = self.__retire_fund_from_source(
@@ -122,41 +338,160 @@ class TransferRequest(models.Model):
                 # successful fund retire and fund add
                 self.completed = True
 
-            else:
+            elif status_code != OUTCOME_UNKNOWN:
                 # successful fund retire and but not fund add, fund reversal
                 self.__reverse_fund_to_source(source_bank_service)
 
         return status_code, response_detail
 
+    def fund_requests(self) -> Dict[str, Tuple[str, str, str, Decimal]]:
+        """Returns the arguments of the retire, add and reverse fund
+        requests of an inter-bank transfer, shared with batched
+        settlement"""
+        return {
+            "retire": (
+                str(self.source_account_id),
+                str(self.destination_bank.uuid),
+                self.info,
+                self.amount,
+            ),
+            "add": (
+                str(self.destination_account_id),
+                str(self.source_bank.uuid),
+                self.info,
+                self.amount,
+            ),
+            # the retired funds come back to the source account from the
+            # destination bank
+            "reverse": (
+                str(self.source_account_id),
+                str(self.destination_bank.uuid),
+                self.info,
+                self.amount,
+            ),
+        }
+
     def __retire_fund_from_source(
-        self, source_bank_service: BankAppAPIClient
+        self, source_bank_service: "BankAppAPIClient"
     ) -> Tuple[int, str]:
         """Retires fund from source account"""
         return source_bank_service.retire_fund_request(
-            str(self.source_account_id),
-            str(self.destination_bank.uuid),
-            self.info,
-            self.amount,
+            *self.fund_requests()["retire"]
         )
 
     def __add_fund_to_destination(
-        self, destination_bank_service: BankAppAPIClient
+        self, destination_bank_service: "BankAppAPIClient"
     ) -> Tuple[int, str]:
         """Adds fund to destination account"""
         return destination_bank_service.add_fund_request(
-            str(self.destination_account_id),
-            str(self.source_bank.uuid),
-            self.info,
-            self.amount,
+            *self.fund_requests()["add"]
         )
 
     def __reverse_fund_to_source(
-        self, source_bank_service: BankAppAPIClient
+        self, source_bank_service: "BankAppAPIClient"
     ) -> Tuple[int, str]:
         """Adds fund to source account"""
         return source_bank_service.add_fund_request(
-            str(self.destination_account_id),
-            str(self.source_bank.uuid),
-            self.info,
-            self.amount,
+            *self.fund_requests()["reverse"]
+        )
+
+
+def add_months(value: datetime.datetime, months: int) -> datetime.datetime:
+    """Adds months to a datetime, clamping the day to the month length"""
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+class ScheduledTransfer(models.Model):
+    """Future dated or recurring transfer, expanded into a TransferRequest
+    each time it is due"""
+
+    ONCE = "once"
+    DAILY = "daily"
+    WEEKLY = "weekly"
+    MONTHLY = "monthly"
+    RECURRENCE_CHOICES = [
+        (ONCE, "Once"),
+        (DAILY, "Daily"),
+        (WEEKLY, "Weekly"),
+        (MONTHLY, "Monthly"),
+    ]
+
+    source_bank: Bank = models.ForeignKey(
+        Bank,
+        on_delete=models.CASCADE,
+        related_name="source_bank_scheduled_transfer",
+    )
+    source_account_id = models.UUIDField()
+    destination_bank: Bank = models.ForeignKey(
+        Bank,
+        on_delete=models.CASCADE,
+        related_name="destination_bank_scheduled_transfer",
+    )
+    destination_account_id = models.UUIDField()
+    amount = models.DecimalField(
+        decimal_places=2, max_digits=18, validators=[MinValueValidator(1)]
+    )
+    info = models.CharField(max_length=255)
+    recurrence = models.CharField(
+        max_length=10, choices=RECURRENCE_CHOICES, default=ONCE
+    )
+    # next occurrence, cleared once the schedule has no occurrence left
+    due_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    # first occurrence, monthly occurrences are counted from it so they
+    # keep its day of the month after a shorter month
+    starts_at = models.DateTimeField(blank=True, null=True, editable=False)
+    ends_at = models.DateTimeField(blank=True, null=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.get_recurrence_display()} transfer of {self.amount} "
+            f"from {self.source_account_id} to {self.destination_account_id}"
+        )
+
+    class Meta:
+        ordering = ["due_at"]
+
+    def save(self, *args, **kwargs) -> None:
+        if self.starts_at is None:
+            self.starts_at = self.due_at
+        super().save(*args, **kwargs)
+
+    def next_due_at(self) -> Optional[datetime.datetime]:
+        """Returns the occurrence after due_at, None when there is none"""
+        if self.recurrence == self.DAILY:
+            next_due_at = self.due_at + datetime.timedelta(days=1)
+        elif self.recurrence == self.WEEKLY:
+            next_due_at = self.due_at + datetime.timedelta(weeks=1)
+        elif self.recurrence == self.MONTHLY:
+            starts_at = self.starts_at or self.due_at
+            months = (self.due_at.year - starts_at.year) * 12 + (
+                self.due_at.month - starts_at.month
+            )
+            next_due_at = add_months(starts_at, months + 1)
+        else:
+            return None
+
+        if self.ends_at is not None and next_due_at > self.ends_at:
+            return None
+        return next_due_at
+
+    def expand(self) -> TransferRequest:
+        """Creates the TransferRequest of the current occurrence and moves
+        the schedule to its next occurrence"""
+        transfer_request = TransferRequest.objects.create(
+            source_bank=self.source_bank,
+            source_account_id=self.source_account_id,
+            destination_bank=self.destination_bank,
+            destination_account_id=self.destination_account_id,
+            amount=self.amount,
+            info=self.info,
+            schedule=self,
         )
+        self.due_at = self.next_due_at()
+        self.save(update_fields=["due_at"])
+        return transfer_request
@@ -0,0 +1,464 @@
+"""Streaming reconciliation of local transfers against bank statements.
+
+Both sides are first spilled to disk into partitions keyed on
+(bank, account, booking date), then every partition is reconciled with a
+hash join in its own process. Memory use is bounded by the largest
+partition rather than by the size of the statements, and the lines of a
+busy bank are spread over every partition instead of landing in one.
+The optional legs of a transfer may land in different partitions, they
+are spilled again partitioned on the transfer and resolved in a second
+step.
+
+A statement line has the fields ``bank`` (bank uuid), ``account``,
+``type`` (``debit``, ``credit`` or ``reversal``), ``amount``, ``date`` and
+``info``. Local transfers expect:
+
+* completed transfers: a debit on the source account and a credit on the
+  destination account
+* failed inter-bank transfers: either nothing, or a debit on the source
+  account together with its reversal
+* transfers whose outcome is unknown: either nothing, or a debit on the
+  source account together with a credit on the destination account, a
+  debit without its credit is reported missing the credit
+
+Every statement line and expected leg ends up in the report with one of
+the statuses below.
+"""
+import csv
+import json
+import os
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, InvalidOperation
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+
+MATCHED = "matched"
+MISSING = "missing"
+AMOUNT_MISMATCH = "amount_mismatch"
+ORPHAN_REVERSAL = "orphan_reversal"
+UNEXPECTED = "unexpected"
+
+STATUSES = (MATCHED, MISSING, AMOUNT_MISMATCH, ORPHAN_REVERSAL, UNEXPECTED)
+
+DEBIT = "debit"
+CREDIT = "credit"
+REVERSAL = "reversal"
+
+
+class StatementError(ValueError):
+    """Raised when a statement line can not be read"""
+
+
+def read_statement(path: str) -> Iterator[dict]:
+    """Streams the lines of a CSV or JSONL statement export
+
+    Parameters
+    ----------
+    path : str
+        Path to a ``.csv`` or ``.jsonl`` file
+
+    Yields
+    ------
+    dict
+        Normalized statement line
+    """
+    with open(path, newline="") as statement:
+        if path.endswith(".csv"):
+            reader = csv.DictReader(statement)
+            rows = ((reader.line_num, row) for row in reader)
+            parse = dict
+        else:
+            rows = (
+                (line_number, line)
+                for line_number, line in enumerate(statement, start=1)
+                if line.strip()
+            )
+            parse = json.loads
+
+        for line_number, row in rows:
+            try:
+                line = normalize_statement_line(parse(row))
+            except (
+                AttributeError,
+                InvalidOperation,
+                KeyError,
+                TypeError,
+                ValueError,
+            ) as exc:
+                raise StatementError(
+                    f"{path}:{line_number}: invalid statement line ({exc})"
+                ) from exc
+            yield line
+
+
+def normalize_statement_line(row: dict) -> dict:
+    """Returns a statement line with normalized field values"""
+    # short CSV rows have None for the missing fields
+    missing = [
+        field
+        for field in ("bank", "account", "type", "amount", "date")
+        if row.get(field) is None
+    ]
+    if missing:
+        raise KeyError(", ".join(missing))
+
+    line_type = str(row["type"]).strip().lower()
+    if line_type not in (DEBIT, CREDIT, REVERSAL):
+        raise KeyError(f"type {line_type!r}")
+
+    return {
+        "bank": str(row["bank"]).strip().lower(),
+        "account": str(row["account"]).strip().lower(),
+        "type": line_type,
+        "amount": str(Decimal(str(row["amount"]))),
+        "date": str(row["date"])[:10],
+        "info": row.get("info") or "",
+    }
+
+
+def expected_legs(
+    transfer_id: int,
+    source_bank: str,
+    source_account: str,
+    destination_bank: str,
+    destination_account: str,
+    amount: Decimal,
+    info: str,
+    completed: Optional[bool],
+    date: str,
+) -> List[dict]:
+    """Returns the statement lines a local transfer should produce
+
+    Legs of failed inter-bank transfers are optional: the bank either
+    booked both the debit and its reversal, or neither. Legs of transfers
+    whose outcome is unknown (``completed`` is None) are optional too.
+    """
+    leg = {"transfer": transfer_id, "amount": str(amount), "date": date}
+    leg["info"] = info or ""
+
+    if completed or completed is None:
+        legs = [
+            dict(leg, bank=source_bank, account=source_account, type=DEBIT),
+            dict(
+                leg,
+                bank=destination_bank,
+                account=destination_account,
+                type=CREDIT,
+            ),
+        ]
+        if completed is None:
+            for unknown_leg in legs:
+                unknown_leg["optional"] = True
+        return legs
+
+    if source_bank != destination_bank:
+        source = dict(leg, bank=source_bank, account=source_account)
+        return [
+            dict(source, type=DEBIT, optional=True),
+            dict(source, type=REVERSAL, optional=True),
+        ]
+
+    return []
+
+
+def transfer_partition_of(leg: dict, partitions: int) -> int:
+    """Returns the partition of an optional leg, by transfer"""
+    return leg["transfer"] % partitions
+
+
+def partition_of(line: dict, partitions: int) -> int:
+    """Returns the partition of a line, stable across processes
+
+    The key is a prefix of the join key.
+    """
+    key = f"{line['bank']}|{line['account']}|{line['date']}".encode()
+    return zlib.crc32(key) % partitions
+
+
+class PartitionWriter:
+    """Spills lines into one JSONL file per partition"""
+
+    def __init__(
+        self,
+        directory: str,
+        prefix: str,
+        partitions: int,
+        partition: Callable[[dict, int], int] = partition_of,
+    ) -> None:
+        self.partitions = partitions
+        self.partition = partition
+        self.files = [
+            open(os.path.join(directory, f"{prefix}-{index}.jsonl"), "w")
+            for index in range(partitions)
+        ]
+
+    def write(self, line: dict) -> None:
+        partition = self.partition(line, self.partitions)
+        self.files[partition].write(json.dumps(line) + "\n")
+
+    def close(self) -> None:
+        for partition_file in self.files:
+            partition_file.close()
+
+    def __enter__(self) -> "PartitionWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _join_key(line: dict) -> Tuple[str, str, str, str, str]:
+    return (
+        line["bank"],
+        line["account"],
+        line["date"],
+        line["info"],
+        line["type"],
+    )
+
+
+def _read_lines(path: str) -> Iterator[dict]:
+    with open(path) as lines:
+        for line in lines:
+            yield json.loads(line)
+
+
+def report_entry(status: str, line: dict, leg: Optional[dict] = None):
+    """Returns the report line of a statement line or expected leg"""
+    entry = {
+        "status": status,
+        "bank": line["bank"],
+        "account": line["account"],
+        "type": line["type"],
+        "date": line["date"],
+        "info": line["info"],
+    }
+    if leg is None or line is not leg:
+        entry["amount"] = line["amount"]
+    if leg is not None:
+        entry["transfer"] = leg["transfer"]
+        entry["expected_amount"] = leg["amount"]
+    return entry
+
+
+def reconcile_partition(
+    local_path: str,
+    statement_path: str,
+    report_path: str,
+    optional_path: str,
+) -> Dict[str, int]:
+    """Reconciles one partition with a hash join
+
+    Local legs are loaded into a hash table and the statement lines are
+    streamed against it. Optional legs are not reported as missing here,
+    they are written to optional_path, flagged when they matched, for
+    ``resolve_optional_legs``.
+
+    Parameters
+    ----------
+    local_path : str
+        Spilled local legs of the partition
+    statement_path : str
+        Spilled statement lines of the partition
+    report_path : str
+        Where the report lines of the partition are written
+    optional_path : str
+        Where the optional legs of the partition are written
+
+    Returns
+    -------
+    Dict[str, int]
+        Number of report lines per status
+    """
+    legs: Dict[Tuple[str, str, str, str, str], List[dict]] = {}
+    for leg in _read_lines(local_path):
+        legs.setdefault(_join_key(leg), []).append(leg)
+
+    counts: Counter = Counter()
+
+    with open(report_path, "w") as report, open(
+        optional_path, "w"
+    ) as optional:
+
+        def emit(status: str, line: dict, leg: Optional[dict] = None):
+            report.write(json.dumps(report_entry(status, line, leg)) + "\n")
+            counts[status] += 1
+
+        for line in _read_lines(statement_path):
+            candidates = legs.get(_join_key(line))
+            if not candidates:
+                status = (
+                    ORPHAN_REVERSAL if line["type"] == REVERSAL else UNEXPECTED
+                )
+                emit(status, line)
+                continue
+
+            amount = Decimal(line["amount"])
+            for index, leg in enumerate(candidates):
+                if Decimal(leg["amount"]) == amount:
+                    break
+            else:
+                index, leg = 0, candidates[0]
+
+            del candidates[index]
+            if leg.get("optional"):
+                optional.write(json.dumps(dict(leg, matched=True)) + "\n")
+            emit(
+                MATCHED if Decimal(leg["amount"]) == amount
+                else AMOUNT_MISMATCH,
+                line,
+                leg,
+            )
+
+        for candidates in legs.values():
+            for leg in candidates:
+                if leg.get("optional"):
+                    optional.write(json.dumps(leg) + "\n")
+                else:
+                    emit(MISSING, leg, leg)
+
+    return dict(counts)
+
+
+def resolve_optional_legs(
+    optional_path: str, report_path: str
+) -> Dict[str, int]:
+    """Reports the unmatched optional legs of transfers that had another
+    leg matched, e.g. a debit booked without its reversal
+
+    Parameters
+    ----------
+    optional_path : str
+        Optional legs of a partition on the transfer, flagged when they
+        matched
+    report_path : str
+        Where the report lines of the partition are written
+
+    Returns
+    -------
+    Dict[str, int]
+        Number of report lines per status
+    """
+    matched = {
+        leg["transfer"]
+        for leg in _read_lines(optional_path)
+        if leg.get("matched")
+    }
+
+    counts: Counter = Counter()
+    with open(report_path, "w") as report:
+        for leg in _read_lines(optional_path):
+            if not leg.get("matched") and leg["transfer"] in matched:
+                report.write(json.dumps(report_entry(MISSING, leg, leg)))
+                report.write("\n")
+                counts[MISSING] += 1
+    return dict(counts)
+
+
+def _run(
+    function: Callable, jobs: List[tuple], workers: int
+) -> List[Dict[str, int]]:
+    if workers == 1:
+        return [function(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(function, *zip(*jobs)))
+
+
+def reconcile(
+    statements: Iterable[dict],
+    local_legs: Iterable[dict],
+    work_dir: str,
+    report_path: str,
+    partitions: int = 64,
+    workers: int = None,
+) -> Dict[str, int]:
+    """Reconciles statement lines against expected local legs
+
+    ``statements`` is fully consumed before ``local_legs`` is iterated, so
+    the local side may depend on what was seen in the statements.
+
+    Parameters
+    ----------
+    statements : Iterable[dict]
+        Normalized statement lines, see ``read_statement``
+    local_legs : Iterable[dict]
+        Expected legs, see ``expected_legs``
+    work_dir : str
+        Directory for the spilled partitions
+    report_path : str
+        JSONL report file
+    partitions : int
+        Number of (bank, account, date) partitions
+    workers : int, optional
+        Number of processes, defaults to the number of cpus
+
+    Returns
+    -------
+    Dict[str, int]
+        Number of report lines per status
+    """
+    with PartitionWriter(work_dir, "statement", partitions) as writer:
+        for line in statements:
+            writer.write(line)
+
+    with PartitionWriter(work_dir, "local", partitions) as writer:
+        for leg in local_legs:
+            writer.write(leg)
+
+    def path(prefix: str, index: int) -> str:
+        return os.path.join(work_dir, f"{prefix}-{index}.jsonl")
+
+    workers = workers or os.cpu_count() or 1
+    results = _run(
+        reconcile_partition,
+        [
+            (
+                path("local", index),
+                path("statement", index),
+                path("report", index),
+                path("optional", index),
+            )
+            for index in range(partitions)
+        ],
+        workers,
+    )
+
+    with PartitionWriter(
+        work_dir, "transfer", partitions, transfer_partition_of
+    ) as writer:
+        for index in range(partitions):
+            for leg in _read_lines(path("optional", index)):
+                writer.write(leg)
+
+    results += _run(
+        resolve_optional_legs,
+        [
+            (path("transfer", index), path("transfer-report", index))
+            for index in range(partitions)
+        ],
+        workers,
+    )
+
+    totals = {status: 0 for status in STATUSES}
+    for counts in results:
+        for status, count in counts.items():
+            totals[status] += count
+
+    with open(report_path, "w") as report:
+        for prefix in ("report", "transfer-report"):
+            for index in range(partitions):
+                with open(path(prefix, index)) as lines:
+                    for line in lines:
+                        report.write(line)
+
+    return totals
@@ -0,0 +1,202 @@
+import datetime
+import heapq
+import logging
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from bank_agent.dispatch import dispatch_many
+from bank_agent.models import ScheduledTransfer, TransferRequest
+
+logger = logging.getLogger(__name__)
+
+
+class Scheduler:
+    """Expands due scheduled transfers into transfer requests and sends them
+
+    Schedules due within ``horizon`` are loaded with an indexed range query
+    on ``due_at`` into an in-memory heap, and the loop sleeps until the
+    earliest of them is due. After downtime, ``catch_up`` expands every
+    missed occurrence in batches before the loop starts.
+
+    Expanding an occurrence and sending its transfer request are separate
+    steps, transfer requests of schedules that were expanded but never
+    sent, because the pass stopped before sending them, are sent on the
+    next pass. A transfer whose send raised may have reached a bank, it is
+    left with an unknown outcome and never sent again, and the other
+    transfers are still sent.
+
+    Only one scheduler should run against a database at a time.
+
+    Parameters
+    ----------
+    batch_size : int
+        Number of schedules expanded per transaction
+    horizon : datetime.timedelta
+        How far ahead due schedules are loaded into the heap
+    """
+
+    # seconds the loop waits after a pass failed
+    retry_delay = 10
+
+    def __init__(
+        self,
+        batch_size: int = 100,
+        horizon: datetime.timedelta = datetime.timedelta(minutes=5),
+    ) -> None:
+        self.batch_size = batch_size
+        self.horizon = horizon
+        self._heap: List[Tuple[datetime.datetime, int]] = []
+
+    def process(self, schedule_ids: Iterable[int]) -> Dict[str, int]:
+        """Expands the due schedules among schedule_ids and sends the
+        created transfer requests, with the ones left unsent by an earlier
+        pass
+
+        Returns
+        -------
+        Dict[str, int]
+            Number of dispatched, completed, failed and unknown outcome
+            transfers
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            schedules = list(
+                ScheduledTransfer.objects.select_for_update()
+                .select_related("source_bank", "destination_bank")
+                .filter(pk__in=list(schedule_ids), due_at__lte=now)
+                .order_by("due_at", "id")
+            )
+            for schedule in schedules:
+                schedule.expand()
+
+        # an occurrence that is still due within the horizon goes back
+        # on the heap
+        for schedule in schedules:
+            if schedule.due_at and schedule.due_at < now + self.horizon:
+                heapq.heappush(self._heap, (schedule.due_at, schedule.pk))
+
+        return self.dispatch_undispatched()
+
+    def dispatch_undispatched(self) -> Dict[str, int]:
+        """Sends the transfer requests of expanded occurrences that were
+        not sent yet, in batches
+
+        Returns
+        -------
+        Dict[str, int]
+            Number of dispatched, completed, failed and unknown outcome
+            transfers
+        """
+        results = {
+            "dispatched": 0, "completed": 0, "failed": 0, "unknown": 0
+        }
+        while True:
+            # transfers are marked before their first bank call, only
+            # transfers never sent have no detail, the detail index finds
+            # them
+            transfer_ids = list(
+                TransferRequest.objects.filter(
+                    schedule__isnull=False, completed=False, detail=None
+                )
+                .order_by("created")
+                .values_list("id", flat=True)[: self.batch_size]
+            )
+            if not transfer_ids:
+                return results
+
+            # a transfer that raises is logged and left unknown, the rest of
+            # its account is picked up again by the next batch
+            batch_results = dispatch_many(
+                TransferRequest.objects.filter(pk__in=transfer_ids),
+                raise_errors=False,
+            )
+            for outcome, count in batch_results.items():
+                results[outcome] += count
+
+    def catch_up(self) -> int:
+        """Sends the expanded occurrences left unsent and expands every
+        occurrence that is already due, in batches
+
+        Returns
+        -------
+        int
+            Number of transfer requests sent
+        """
+        sent = self.dispatch_undispatched()["dispatched"]
+        while True:
+            schedule_ids = list(
+                ScheduledTransfer.objects.filter(due_at__lte=timezone.now())
+                .order_by("due_at")
+                .values_list("id", flat=True)[: self.batch_size]
+            )
+            if not schedule_ids:
+                return sent
+            sent += self.process(schedule_ids)["dispatched"]
+
+    def refresh(self) -> None:
+        """Reloads the heap with the schedules due within the horizon"""
+        self._heap = list(
+            ScheduledTransfer.objects.filter(
+                due_at__lt=timezone.now() + self.horizon
+            )
+            .order_by("due_at")
+            .values_list("due_at", "id")[: self.batch_size * 10]
+        )
+        heapq.heapify(self._heap)
+
+    def run_pending(self) -> int:
+        """Sends the schedules of the heap that are due
+
+        Returns
+        -------
+        int
+            Number of transfer requests sent
+        """
+        sent = 0
+        now = timezone.now()
+        while self._heap and self._heap[0][0] <= now:
+            schedule_ids = set()
+            while (
+                self._heap
+                and self._heap[0][0] <= now
+                and len(schedule_ids) < self.batch_size
+            ):
+                schedule_ids.add(heapq.heappop(self._heap)[1])
+            sent += self.process(schedule_ids)["dispatched"]
+        return sent
+
+    def seconds_until_next(self) -> float:
+        """Returns how long until the earliest schedule of the heap is due"""
+        if not self._heap:
+            return self.horizon.total_seconds()
+        delay = self._heap[0][0] - timezone.now()
+        return max(delay.total_seconds(), 0)
+
+    def run_forever(self, stop: threading.Event = None) -> None:
+        """Runs the scheduler loop until stop is set
+
+        A failed pass is logged and the loop starts over with ``catch_up``
+        after ``retry_delay`` seconds.
+        """
+        stop = stop or threading.Event()
+        refresh_interval = self.horizon.total_seconds() / 2
+
+        while not stop.is_set():
+            try:
+                self.catch_up()
+                self.refresh()
+                refresh_at = timezone.now() + datetime.timedelta(
+                    seconds=refresh_interval
+                )
+                while not stop.is_set() and timezone.now() < refresh_at:
+                    self.run_pending()
+                    until_refresh = (
+                        refresh_at - timezone.now()
+                    ).total_seconds()
+                    stop.wait(min(self.seconds_until_next(), until_refresh))
+            except Exception:
+                logger.exception("Sending scheduled transfers failed")
+                stop.wait(self.retry_delay)
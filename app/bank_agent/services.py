@@ -1,7 +1,25 @@
-import requests
-from typing import Tuple
+import json
+import time
+from typing import TYPE_CHECKING, Dict, List, Tuple, Union
 from decimal import Decimal
 
+from bank_agent.account_cache import (
+    invalid_accounts,
+    is_invalid_account_message,
+)
+from bank_agent.admission import admission
+from bank_agent.latency import latency_estimator
+from bank_agent.transports import get_transport
+
+if TYPE_CHECKING:
+    import requests
+
+
+# status of a call that may or may not have been applied by the bank: the
+# request was sent but no answer came back in time. It must not be
+# treated as a failure, e.g. by reversing funds.
+OUTCOME_UNKNOWN = 504
+
 
 class BankAppAPIClient:
     # connects to the bank API
@@ -11,6 +29,7 @@ class BankAppAPIClient:
         bank_url: str,
         bank_id: str,
         bank_name: str,
+        transport=None,
     ) -> None:
         """_summary_
 
@@ -24,11 +43,15 @@ class BankAppAPIClient:
             Bank id
         bank_name : str
             Bank name
+        transport : optional
+            Transport sending the requests, the one configured in the
+            settings by default
         """
         self.bank_token = bank_token
         self.bank_url = bank_url
         self.bank_id = bank_id
         self.bank_name = bank_name
+        self.transport = transport or get_transport()
 
     def intra_bank_transfer_request(
         self,
@@ -69,8 +92,12 @@ class BankAppAPIClient:
             "info": info,
             "amount": amount,
         }
+        accounts = {
+            "source": source_account_id,
+            "destination": destination_account_id,
+        }
 
-        return self.__send_request(url, headers, data)
+        return self.__send_request("transfer", url, headers, data, accounts)
 
     def retire_fund_request(
         self,
@@ -106,8 +133,9 @@ class BankAppAPIClient:
             "info": info,
             "amount": amount,
         }
+        accounts = {"source": source_account_id}
 
-        return self.__send_request(url, headers, data)
+        return self.__send_request("retire", url, headers, data, accounts)
 
     def add_fund_request(
         self,
@@ -143,38 +171,181 @@ class BankAppAPIClient:
             "info": info,
             "amount": amount,
         }
+        accounts = {"destination": destination_account_id}
+
+        return self.__send_request("add", url, headers, data, accounts)
+
+    def batch_fund_request(
+        self,
+        operation: str,
+        fund_requests: List[Tuple[str, str, str, Decimal]],
+    ) -> List[Tuple[int, str]]:
+        """Send several retire or add fund requests in one batch
+
+        The operations are sent to ``<bank url><operation>/batch/`` as a
+        JSON list in the ``operations`` field, each naming its account in
+        the ``source`` or ``destination`` field its errors are reported
+        under, the bank answers with one result per operation in the same
+        order::
+
+            {"results": [{"status": 201}, {"status": 400, "errors": {...}}]}
+
+        Parameters
+        ----------
+        operation : str
+            ``retire`` or ``add``
+        fund_requests : List[Tuple[str, str, str, Decimal]]
+            Arguments of ``retire_fund_request`` or ``add_fund_request``,
+            the account, the other bank UUID, the info and the amount
+
+        Returns
+        -------
+        List[Tuple[int, str]]
+            Status code and Response text of each request, the status and
+            text of the batch for all of them when it failed as a whole,
+            ``OUTCOME_UNKNOWN`` for all of them when the bank accepted it
+            without a result per request
+        """
+        if operation == "retire":
+            account_field, bank_field = "source", "dst_bank"
+        else:
+            account_field, bank_field = "destination", "src_bank"
+
+        url = f"{self.bank_url}{operation}/batch/"
+        headers = {
+            "Authorization": f"Token {self.bank_token}",
+        }
+        data = {
+            "operations": json.dumps(
+                [
+                    {
+                        account_field: account_id,
+                        bank_field: bank_id,
+                        "info": info,
+                        "amount": str(amount),
+                    }
+                    for account_id, bank_id, info, amount in fund_requests
+                ]
+            )
+        }
+
+        res = self.__put(f"{operation}_batch", url, headers, data)
+        if isinstance(res, tuple):
+            return [res] * len(fund_requests)
+        if res.status_code not in (200, 201, 207):
+            return [self.__process_response(res)] * len(fund_requests)
+
+        # the bank accepted the batch, its operations may have been applied
+        results = res.json().get("results") or []
+        if len(results) != len(fund_requests):
+            unknown = (OUTCOME_UNKNOWN, "Service is unavailable")
+            return [unknown] * len(fund_requests)
+
+        responses = []
+        for (account_id, *_), result in zip(fund_requests, results):
+            status_code = result.get("status")
+            errors = result.get("errors") or {}
+            if status_code == 400:
+                self.__record_invalid_accounts(
+                    errors, {account_field: account_id}
+                )
+            responses.append(
+                (status_code, self.__response_text(status_code, errors))
+            )
+        return responses
+
+    def __put(
+        self, operation: str, url: str, headers: dict, data: dict
+    ) -> Union["requests.Response", Tuple[int, str]]:
+        """Sends a request to the bank, returns the response or the status
+        code and text of the failure when there is no response"""
+        import requests
+
+        timeout = latency_estimator.timeout(self.bank_id, operation)
+        started = time.perf_counter()
+        try:
+            with admission.track(self.bank_id):
+                res = self.transport.put(url, headers, data, timeout=timeout)
+        except requests.exceptions.ConnectTimeout:
+            # the bank was never reached, nothing was sent
+            latency_estimator.record(self.bank_id, operation, timeout)
+            return (500, "Service timed out.")
+        except requests.exceptions.Timeout:
+            latency_estimator.record(self.bank_id, operation, timeout)
+            return (OUTCOME_UNKNOWN, "Service timed out.")
+        except requests.exceptions.ConnectionError:
+            return (500, "Service is unavailable.")
 
-        return self.__send_request(url, headers, data)
+        latency_estimator.record(
+            self.bank_id, operation, time.perf_counter() - started
+        )
+        return res
 
     def __send_request(
-        self, url: str, headers: str, data: str
+        self,
+        operation: str,
+        url: str,
+        headers: str,
+        data: str,
+        accounts: Dict[str, str] = None,
     ) -> Tuple[int, str]:
         """Sends request to the server and returns response details
 
         Parameters
         ----------
+        operation : str
+            bank operation, ``transfer``, ``retire`` or ``add``, the
+            timeout is derived from its recent latencies
         url : str
             request url
         headers : str
             request headers
         data : str
             request payload
+        accounts : Dict[str, str], optional
+            account ids keyed on the response field the bank reports
+            errors for them under
 
         Returns
         -------
         Tuple[int, str]
             Status code and Response text
         """
+        res = self.__put(operation, url, headers, data)
+        if isinstance(res, tuple):
+            return res
 
-        try:
-            res = requests.put(url, headers=headers, data=data)
-        except requests.exceptions.ConnectionError:
-            return (500, "Service is unavailable.")
+        if res.status_code == 400 and accounts:
+            self.__record_invalid_accounts(res.json(), accounts)
 
         return self.__process_response(res)
 
+    def __record_invalid_accounts(
+        self, response_json: dict, accounts: Dict[str, str]
+    ) -> None:
+        """Adds accounts the bank reported as missing or closed to the
+        negative cache
+
+        Parameters
+        ----------
+        response_json : dict
+            400 response payload
+        accounts : Dict[str, str]
+            account ids keyed on response field
+        """
+        for field, account_id in accounts.items():
+            messages = response_json.get(field)
+            if messages and is_invalid_account_message(messages):
+                if isinstance(messages, str):
+                    messages = [messages]
+                invalid_accounts.add(
+                    self.bank_id,
+                    account_id,
+                    f"{field}: {', '.join(messages)}",
+                )
+
     @staticmethod
-    def __process_response(res: requests.Response) -> Tuple[int, str]:
+    def __process_response(res: "requests.Response") -> Tuple[int, str]:
         """Precess the request response to response code and response text
 
         Parameters
@@ -191,6 +362,13 @@ class BankAppAPIClient:
         response_code = res.status_code
         response_json = res.json()
 
+        return response_code, BankAppAPIClient.__response_text(
+            response_code, response_json
+        )
+
+    @staticmethod
+    def __response_text(response_code: int, response_json: dict) -> str:
+        """Returns the response text of a status code and payload"""
         if response_code == 200 or response_code == 201:
             response_text = "Success"
         elif response_code == 400:
@@ -203,7 +381,7 @@ class BankAppAPIClient:
         else:
             response_text = "Service is unavailable"
 
-        return response_code, response_text
+        return response_text
 
     def __str__(self) -> str:
         return f"{self.bank_name}, {self.bank_id} Client"
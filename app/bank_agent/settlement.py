@@ -0,0 +1,192 @@
+import threading
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from django.conf import settings
+
+from bank_agent.services import OUTCOME_UNKNOWN
+
+if TYPE_CHECKING:
+    from bank_agent.models import TransferRequest
+    from bank_agent.services import BankAppAPIClient
+
+
+class SettlementBatch:
+    """Inter-bank transfers of one (source bank, destination bank) pair
+    collected during a window"""
+
+    __slots__ = ("transfers", "futures", "closed")
+
+    def __init__(self) -> None:
+        self.transfers: List["TransferRequest"] = []
+        self.futures: List[Future] = []
+        # set when the batch is full before the end of its window
+        self.closed = threading.Event()
+
+
+class SettlementBatcher:
+    """Settles inter-bank transfers in batches per bank pair
+
+    The first transfer of a bank pair opens a window, the transfers of the
+    same pair sent during the window join it, and the thread of the first
+    transfer then settles all of them: one batched retire call to the
+    source bank, one batched add call to the destination bank for the
+    retired transfers, and one batched reversal to the source bank for the
+    transfers whose add failed, not for those whose add outcome is
+    unknown. Banks without batch support get the
+    requests of a batch one after the other. Each caller waits for the
+    outcome of its own transfer, which is the one
+    ``TransferRequest.send_request_to_banks`` gets from per-transfer
+    calls.
+
+    Parameters
+    ----------
+    window : float
+        Seconds transfers are collected before a batch is settled, 0
+        disables batching
+    max_size : int
+        Number of transfers settled right away without waiting for the
+        end of the window
+    """
+
+    def __init__(self, window: float, max_size: int = 100) -> None:
+        self.window = window
+        self.max_size = max_size
+        self._open: Dict[Tuple[int, int], SettlementBatch] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def settle(self, transfer: "TransferRequest") -> Tuple[int, str]:
+        """Settles an inter-bank transfer with the other transfers of its
+        bank pair
+
+        Parameters
+        ----------
+        transfer : TransferRequest
+            Inter-bank transfer request
+
+        Returns
+        -------
+        Tuple[int, str]
+            Status code and Response text of the transfer
+        """
+        key = (transfer.source_bank_id, transfer.destination_bank_id)
+        future: Future = Future()
+
+        with self._lock:
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._open[key] = SettlementBatch()
+            batch.transfers.append(transfer)
+            batch.futures.append(future)
+            if len(batch.transfers) >= self.max_size:
+                del self._open[key]
+                batch.closed.set()
+
+        if leader:
+            batch.closed.wait(self.window)
+            with self._lock:
+                if self._open.get(key) is batch:
+                    del self._open[key]
+            self._settle_batch(batch)
+
+        return future.result()
+
+    def _settle_batch(self, batch: SettlementBatch) -> None:
+        try:
+            outcomes = settle_transfers(batch.transfers)
+        except Exception as exc:
+            for future in batch.futures:
+                future.set_exception(exc)
+        else:
+            for future, outcome in zip(batch.futures, outcomes):
+                future.set_result(outcome)
+
+
+def _fund_requests(
+    service: "BankAppAPIClient",
+    batched: bool,
+    operation: str,
+    requests: List[Tuple[str, str, str, object]],
+) -> List[Tuple[int, str]]:
+    """Sends retire or add requests to a bank, batched if it supports it"""
+    if not requests:
+        return []
+    if batched:
+        return service.batch_fund_request(operation, requests)
+
+    send = (
+        service.retire_fund_request
+        if operation == "retire"
+        else service.add_fund_request
+    )
+    return [send(*request) for request in requests]
+
+
+def settle_transfers(
+    transfers: List["TransferRequest"],
+) -> List[Tuple[int, str]]:
+    """Settles inter-bank transfers between the same two banks
+
+    Parameters
+    ----------
+    transfers : List[TransferRequest]
+        Transfers with the same source and destination banks
+
+    Returns
+    -------
+    List[Tuple[int, str]]
+        Status code and Response text of each transfer
+    """
+    source_bank = transfers[0].source_bank
+    destination_bank = transfers[0].destination_bank
+    source_bank_service = source_bank.get_client()
+    destination_bank_service = destination_bank.get_client()
+    fund_requests = [transfer.fund_requests() for transfer in transfers]
+
+    # retire funds from the source accounts
+    outcomes = _fund_requests(
+        source_bank_service,
+        source_bank.supports_batch,
+        "retire",
+        [requests["retire"] for requests in fund_requests],
+    )
+
+    # add funds to the destination accounts of the retired transfers
+    retired = [
+        index for index, (status_code, _) in enumerate(outcomes)
+        if status_code == 201
+    ]
+    added = _fund_requests(
+        destination_bank_service,
+        destination_bank.supports_batch,
+        "add",
+        [fund_requests[index]["add"] for index in retired],
+    )
+    for index, outcome in zip(retired, added):
+        outcomes[index] = outcome
+
+    # reverse the retired funds that could not be added, funds the
+    # destination bank may have added are left to reconciliation
+    reversed_ = [
+        index for index, (status_code, _) in zip(retired, added)
+        if status_code not in (201, OUTCOME_UNKNOWN)
+    ]
+    _fund_requests(
+        source_bank_service,
+        source_bank.supports_batch,
+        "add",
+        [fund_requests[index]["reverse"] for index in reversed_],
+    )
+
+    return outcomes
+
+
+settlement_batcher = SettlementBatcher(
+    window=settings.SETTLEMENT_WINDOW,
+    max_size=settings.SETTLEMENT_BATCH_SIZE,
+)
@@ -0,0 +1,126 @@
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+from django.test import SimpleTestCase, TestCase
+
+from bank_agent.account_cache import InvalidAccountCache, invalid_accounts
+from bank_agent.models import Bank, TransferRequest
+from bank_agent.utils import sample_bank
+
+
+def sample_response(status_code, payload):
+    """Create a sample requests response"""
+    res = MagicMock(status_code=status_code)
+    res.json.return_value = payload
+    return res
+
+
+class InvalidAccountCacheTests(SimpleTestCase):
+    """Test the invalid account negative cache"""
+
+    def test_get_counts_hits_and_misses(self):
+        """Test cached accounts are hits and others are misses"""
+        cache = InvalidAccountCache(ttl=60)
+        cache.add("bank", "account", "destination: does not exist")
+
+        self.assertEqual(
+            cache.get("bank", "account"), "destination: does not exist"
+        )
+        self.assertIsNone(cache.get("bank", "other"))
+        self.assertEqual(
+            cache.stats(), {"hits": 1, "misses": 1, "size": 1}
+        )
+
+    @patch("bank_agent.account_cache.time.monotonic")
+    def test_entries_expire_after_ttl(self, monotonic):
+        """Test entries are dropped once the ttl has elapsed"""
+        cache = InvalidAccountCache(ttl=60)
+        monotonic.return_value = 100
+        cache.add("bank", "account", "closed")
+
+        monotonic.return_value = 161
+        self.assertIsNone(cache.get("bank", "account"))
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_invalidate(self):
+        """Test invalidating a single account and a whole bank"""
+        cache = InvalidAccountCache(ttl=60)
+        cache.add("bank", "account_1", "closed")
+        cache.add("bank", "account_2", "closed")
+        cache.add("other_bank", "account_1", "closed")
+
+        cache.invalidate("bank", "account_1")
+        self.assertIsNone(cache.get("bank", "account_1"))
+        self.assertIsNotNone(cache.get("bank", "account_2"))
+
+        cache.invalidate("bank")
+        self.assertIsNone(cache.get("bank", "account_2"))
+        self.assertIsNotNone(cache.get("other_bank", "account_1"))
+
+    def test_max_size_evicts_oldest(self):
+        """Test the oldest entry is evicted when the cache is full"""
+        cache = InvalidAccountCache(ttl=60, max_size=2)
+        for account in ("account_1", "account_2", "account_3"):
+            cache.add("bank", account, "closed")
+
+        self.assertIsNone(cache.get("bank", "account_1"))
+        self.assertIsNotNone(cache.get("bank", "account_3"))
+
+
+class InvalidAccountTransferTests(TestCase):
+    """Test transfers are rejected locally for known invalid accounts"""
+
+    def setUp(self):
+        invalid_accounts.clear()
+        self.addCleanup(invalid_accounts.clear)
+
+    def sample_transfer(self, source_bank: Bank, destination_bank: Bank):
+        return TransferRequest.objects.create(
+            source_bank=source_bank,
+            source_account_id=uuid4(),
+            destination_bank=destination_bank,
+            destination_account_id="bbbadca3-2fdb-4036-ae04-c23dca10c93c",
+            amount=10,
+            info="test info",
+        )
+
+    @patch("requests.put")
+    def test_missing_destination_skips_next_transfer(self, put):
+        """Test a missing destination is not sent to the banks again"""
+        source_bank: Bank = sample_bank()
+        destination_bank: Bank = sample_bank()
+        detail = (
+            "destination: Object with uuid=bbbadca3-2fdb-4036-ae04-c23dca10c"
+            "93c does not exist."
+        )
+        put.side_effect = [
+            sample_response(201, {}),
+            sample_response(400, {"destination": [detail[13:]]}),
+            sample_response(201, {}),
+        ]
+
+        first = self.sample_transfer(source_bank, destination_bank)
+        first.send_request_to_banks()
+        self.assertEqual(put.call_count, 3)  # retire, add and reversal
+
+        second = self.sample_transfer(source_bank, destination_bank)
+        second.send_request_to_banks()
+
+        self.assertEqual(put.call_count, 3)
+        self.assertFalse(second.completed)
+        self.assertEqual(second.service_detail, detail)
+        self.assertEqual(invalid_accounts.stats()["hits"], 1)
+
+    @patch("requests.put")
+    def test_insufficient_fund_is_not_cached(self, put):
+        """Test 400 responses about the balance are not cached"""
+        bank: Bank = sample_bank()
+        put.return_value = sample_response(
+            400, {"source": ["Account does not have enough fund"]}
+        )
+
+        self.sample_transfer(bank, bank).send_request_to_banks()
+        self.sample_transfer(bank, bank).send_request_to_banks()
+
+        self.assertEqual(put.call_count, 2)
+        self.assertEqual(invalid_accounts.stats()["size"], 0)
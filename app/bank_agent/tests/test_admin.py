@@ -0,0 +1,91 @@
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from bank_agent.admin import CappedCountPaginator
+from bank_agent.models import Bank, TransferRequest
+from bank_agent.utils import sample_bank
+
+
+CHANGELIST_URL = reverse("admin:bank_agent_transferrequest_changelist")
+
+
+class TransferRequestAdminTests(TestCase):
+    """Test the transfer request admin"""
+
+    def setUp(self):
+        user = get_user_model().objects.create_superuser(
+            "admin", "admin@test.com", "password"
+        )
+        self.client.force_login(user)
+        self.bank: Bank = sample_bank()
+        self.account_id = uuid4()
+        for _ in range(5):
+            TransferRequest.objects.create(
+                source_bank=self.bank,
+                source_account_id=self.account_id,
+                destination_bank=sample_bank(),
+                destination_account_id=uuid4(),
+                amount=10,
+            )
+
+    def test_changelist_query_count_is_constant(self):
+        """Test banks are not loaded row by row on the changelist"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(CHANGELIST_URL)
+
+        self.assertEqual(res.status_code, 200)
+        bank_queries = [
+            query
+            for query in queries.captured_queries
+            if query["sql"].startswith('SELECT "bank_agent_bank"')
+        ]
+        self.assertEqual(bank_queries, [])
+
+    def test_changelist_does_not_list_dates(self):
+        """Test the landing page and the date filter never truncate the
+        created date of every row"""
+        for params in ({}, {"created__gte": "2000-01-01"}):
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.get(CHANGELIST_URL, params)
+
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(res.context["cl"].result_count, 5)
+            self.assertFalse(
+                any(
+                    "datetime_trunc" in query["sql"]
+                    or "DISTINCT" in query["sql"]
+                    for query in queries.captured_queries
+                )
+            )
+
+    def test_search_by_account_id(self):
+        """Test searching the changelist by exact account id reads the
+        account id indexes"""
+        res = self.client.get(CHANGELIST_URL, {"q": str(self.account_id)})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.context["cl"].result_count, 5)
+        plan = res.context["cl"].queryset.explain()
+        self.assertNotIn("SCAN bank_agent_transferrequest", plan)
+        self.assertIn("transfer_src_acct_created_idx", plan)
+        self.assertIn("transfer_dst_acct_created_idx", plan)
+
+    def test_search_by_other_text(self):
+        """Test a search that is not an account id matches nothing"""
+        res = self.client.get(CHANGELIST_URL, {"q": "not an account"})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.context["cl"].result_count, 0)
+
+    def test_paginator_count_is_capped(self):
+        """Test the paginator stops counting at max_count"""
+        paginator = CappedCountPaginator(TransferRequest.objects.all(), 2)
+        paginator.max_count = 3
+
+        self.assertEqual(paginator.count, 3)
+        self.assertEqual(paginator.num_pages, 2)
@@ -0,0 +1,104 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from bank_agent.admission import AdmissionController
+from bank_agent.models import Bank, TransferRequest
+from bank_agent.utils import sample_bank
+
+
+INDEX_URL = reverse("bank_agent:index")
+ADMISSION_STATE_URL = reverse("bank_agent:admission_state")
+
+
+class AdmissionControllerTests(SimpleTestCase):
+    """Test tracking of outstanding bank calls"""
+
+    def test_track_counts_calls_in_flight(self):
+        """Test calls are counted while in flight, also when they raise"""
+        controller = AdmissionController()
+
+        with controller.track("bank"):
+            with controller.track("bank"):
+                self.assertEqual(
+                    controller.state()["outstanding_per_bank"], {"bank": 2}
+                )
+        with self.assertRaises(ValueError):
+            with controller.track("bank"):
+                raise ValueError()
+
+        self.assertEqual(controller.state()["outstanding"], 0)
+        self.assertEqual(controller.state()["outstanding_per_bank"], {})
+
+    def test_admit_thresholds(self):
+        """Test submissions are shed past the global and per bank limits"""
+        controller = AdmissionController(
+            max_outstanding=3, max_outstanding_per_bank=2
+        )
+
+        with controller.track("bank_1"), controller.track("bank_1"):
+            self.assertIsNone(controller.admit(["bank_2"]))
+            self.assertIsNotNone(controller.admit(["bank_2", "bank_1"]))
+
+            with controller.track("bank_2"):
+                self.assertIsNotNone(controller.admit())
+
+        self.assertIsNone(controller.admit(["bank_1"]))
+        self.assertEqual(controller.state()["shed"], 2)
+
+
+class AdmissionViewTests(TestCase):
+    """Test load shedding on transfer submission"""
+
+    def setUp(self):
+        self.bank: Bank = sample_bank()
+        self.controller = AdmissionController(
+            max_outstanding=2, max_outstanding_per_bank=1, retry_after=7
+        )
+        patcher = patch("bank_agent.views.admission", self.controller)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.payload = {
+            "source_bank": self.bank.id,
+            "source_account_id": "8bce8de8-4856-4113-aff7-0812a5c6ea29",
+            "destination_bank": self.bank.id,
+            "destination_account_id": "bbbadca3-2fdb-4036-ae04-c23dca10c93c",
+            "amount": 10,
+            "info": "test info",
+        }
+
+    def test_submission_shed_when_overloaded(self):
+        """Test submissions get a 503 while reads are still served"""
+        with self.controller.track("a"), self.controller.track("b"):
+            res = self.client.post(INDEX_URL, self.payload)
+            self.assertEqual(res.status_code, 503)
+            self.assertEqual(res["Retry-After"], "7")
+
+            self.assertEqual(self.client.get(INDEX_URL).status_code, 200)
+
+        self.assertFalse(TransferRequest.objects.exists())
+
+    def test_submission_shed_when_bank_busy(self):
+        """Test submissions to a busy bank get a 429"""
+        with self.controller.track(self.bank.uuid):
+            res = self.client.post(INDEX_URL, self.payload)
+
+        self.assertEqual(res.status_code, 429)
+        self.assertFalse(TransferRequest.objects.exists())
+
+    def test_admission_state(self):
+        """Test the admission state is exposed to staff only"""
+        res = self.client.get(ADMISSION_STATE_URL)
+        self.assertEqual(res.status_code, 302)
+
+        user = get_user_model().objects.create_user(
+            "staff", "staff@test.com", "password", is_staff=True
+        )
+        self.client.force_login(user)
+        with self.controller.track("a"):
+            res = self.client.get(ADMISSION_STATE_URL)
+
+        self.assertEqual(res.json()["outstanding"], 1)
+        self.assertEqual(res.json()["max_outstanding_per_bank"], 1)
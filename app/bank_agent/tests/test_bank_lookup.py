@@ -0,0 +1,100 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from bank_agent.utils import sample_bank
+from bank_agent.views import search_banks
+
+
+INDEX_URL = reverse("bank_agent:index")
+BANK_LOOKUP_URL = reverse("bank_agent:bank_lookup")
+
+
+class BankLookupTests(TestCase):
+    """Test the bank lookup endpoint used by the transfer form"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_lookup_matches_prefix_case_insensitive(self):
+        """Test banks are matched on a case insensitive name prefix"""
+        bank = sample_bank(name="Alpha Bank")
+        sample_bank(name="alpine Bank")
+        sample_bank(name="Beta Bank")
+
+        res = self.client.get(BANK_LOOKUP_URL, {"q": "AL"})
+
+        self.assertEqual(res.status_code, 200)
+        results = res.json()["results"]
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]["id"], bank.id)
+        self.assertEqual(results[0]["text"], f"Alpha Bank ({bank.uuid})")
+
+    def test_lookup_matches_non_ascii_prefix(self):
+        """Test names are lowercased beyond ASCII and names with
+        characters above U+FFFF after the prefix are matched"""
+        bank = sample_bank(name="École Bank")
+        sample_bank(name="e\U0001f3e6 Bank")
+        sample_bank(name="f Bank")
+
+        self.assertEqual(
+            [result["id"] for result in search_banks("é", 20)], [bank.id]
+        )
+        self.assertEqual(len(search_banks("É", 20)), 1)
+        self.assertEqual(len(search_banks("e", 20)), 1)
+
+    def test_lookup_without_query(self):
+        """Test an empty query returns no banks"""
+        sample_bank()
+        res = self.client.get(BANK_LOOKUP_URL)
+
+        self.assertEqual(res.json(), {"results": []})
+
+    def test_lookup_results_are_cached(self):
+        """Test repeated lookups are served from the cache"""
+        sample_bank(name="Alpha Bank")
+        self.client.get(BANK_LOOKUP_URL, {"q": "alp"})
+
+        with self.assertNumQueries(0):
+            res = self.client.get(BANK_LOOKUP_URL, {"q": "Alp"})
+        self.assertEqual(len(res.json()["results"]), 1)
+
+    def test_lookup_uses_name_index(self):
+        """Test the prefix search is served by the lower(name) index"""
+        with CaptureQueriesContext(connection) as queries:
+            search_banks("Al", 20)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "EXPLAIN QUERY PLAN " + queries.captured_queries[0]["sql"]
+            )
+            plan = " ".join(str(row) for row in cursor.fetchall())
+
+        self.assertIn("bank_agent_bank_name_lower", plan)
+
+    def test_index_page_size_is_constant(self):
+        """Test bank names are not embedded in the transfer form"""
+        for index in range(50):
+            sample_bank(name=f"bank {index}", uuid=uuid4())
+
+        res = self.client.get(INDEX_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn("bank 49", res.content.decode())
+
+    def test_invalid_bank_id_renders_empty_picker(self):
+        """Test a submitted bank that is not an id renders an empty picker
+        instead of failing"""
+        for value in ("abc", "1.5"):
+            with self.subTest(value=value):
+                res = self.client.post(INDEX_URL, {"source_bank": value})
+                self.assertEqual(res.status_code, 200)
+                self.assertIn("source_bank", res.context["form"].errors)
+
+                res = self.client.get(INDEX_URL, {"source_bank": value})
+                self.assertEqual(res.status_code, 200)
@@ -0,0 +1,251 @@
+import json
+import threading
+from decimal import Decimal
+from unittest.mock import patch
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from bank_agent.callbacks import CallbackBuffer, callback_buffer
+from bank_agent.models import Bank, TransferRequest
+from bank_agent.utils import sample_bank
+from bank_agent.velocity import VelocityLimiter
+
+
+CALLBACK_URL = reverse("bank_agent:bank_callback")
+
+
+class CallbackBufferTests(TestCase):
+    """Test buffering of settlement notifications"""
+
+    def test_flush_applies_latest_notification(self):
+        """Test pending notifications are applied in one batch"""
+        bank: Bank = sample_bank()
+        transfer, other = [
+            TransferRequest.objects.create(
+                source_bank=bank,
+                source_account_id=uuid4(),
+                destination_bank=bank,
+                destination_account_id=uuid4(),
+                amount=10,
+                completed=None,
+            )
+            for _ in range(2)
+        ]
+        buffer = CallbackBuffer(delay=60)
+        buffer._start = lambda: None
+
+        buffer.add(transfer.pk, False, "Pending")
+        buffer.add(transfer.pk, True, "Settled")
+        buffer.add(other.pk, True, "Settled")
+        transfer.refresh_from_db()
+        self.assertIsNone(transfer.completed)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(buffer.flush(), 2)
+        updates = [
+            query
+            for query in queries.captured_queries
+            if query["sql"].startswith("UPDATE")
+        ]
+        self.assertEqual(len(updates), 1)
+        transfer.refresh_from_db()
+        self.assertTrue(transfer.completed)
+        self.assertEqual(transfer.service_detail, "Settled")
+
+    def test_resent_notification_counted_once(self):
+        """Test a transfer completed by a notification the bank resends
+        counts once towards the velocity limits"""
+        bank: Bank = sample_bank()
+        account_id = uuid4()
+        transfer = TransferRequest.objects.create(
+            source_bank=bank,
+            source_account_id=account_id,
+            destination_bank=bank,
+            destination_account_id=uuid4(),
+            amount=10,
+            completed=None,
+        )
+        limiter = VelocityLimiter(window=3600, max_transfers=2)
+        buffer = CallbackBuffer(delay=60)
+        buffer._start = lambda: None
+
+        with patch("bank_agent.callbacks.velocity_limits", limiter):
+            buffer.add(transfer.pk, True, "Settled")
+            buffer.add(transfer.pk, True, "Settled")
+            buffer.flush()
+            buffer.add(transfer.pk, True, "Settled")
+            buffer.flush()
+
+        self.assertIsNone(limiter.check(bank.pk, account_id, Decimal(10)))
+        self.assertIsNotNone(limiter.check(bank.pk, account_id, Decimal(10)))
+
+    def test_failed_flush_is_retried(self):
+        """Test the flusher thread logs a failed flush and retries it"""
+        buffer = CallbackBuffer(delay=0.01)
+        buffer.retry_delay = 0
+        flushed = threading.Event()
+        calls = []
+
+        def flush():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("database is locked")
+            flushed.set()
+            return 0
+
+        with patch.object(buffer, "flush", side_effect=flush):
+            with self.assertLogs("bank_agent.callbacks", "ERROR"):
+                threading.Thread(target=buffer._run, daemon=True).start()
+                buffer._wakeup.set()
+                self.assertTrue(flushed.wait(5))
+
+        self.assertEqual(len(calls), 2)
+
+    def test_full_buffer_is_flushed(self):
+        """Test the buffer is applied once max_size is reached"""
+        buffer = CallbackBuffer(delay=60, max_size=2)
+        buffer._start = lambda: None
+
+        with patch.object(buffer, "flush") as flush:
+            buffer.add(1, True, "Success")
+            flush.assert_not_called()
+            buffer.add(2, True, "Success")
+            flush.assert_called_once()
+
+
+@patch.object(callback_buffer, "delay", 0)
+class BankCallbackViewTests(TestCase):
+    """Test the bank callback endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.bank: Bank = sample_bank(token="bank-token")
+        self.other_bank: Bank = sample_bank(token="other-token")
+        self.transfers = [
+            TransferRequest.objects.create(
+                source_bank=self.bank,
+                source_account_id=uuid4(),
+                destination_bank=self.other_bank,
+                destination_account_id=uuid4(),
+                amount=10,
+                completed=None,
+            )
+            for _ in range(3)
+        ]
+        self.foreign_transfer = TransferRequest.objects.create(
+            source_bank=self.other_bank,
+            source_account_id=uuid4(),
+            destination_bank=self.other_bank,
+            destination_account_id=uuid4(),
+            amount=10,
+            completed=None,
+        )
+
+    def post(self, payload, token="bank-token"):
+        return self.client.post(
+            CALLBACK_URL,
+            json.dumps(payload),
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Token {token}",
+        )
+
+    def test_single_notification(self):
+        """Test a single notification is applied"""
+        res = self.post(
+            {"transfer": self.transfers[0].pk, "completed": True}
+        )
+
+        self.assertEqual(res.status_code, 202)
+        self.assertEqual(res.json(), {"accepted": 1, "rejected": []})
+        self.transfers[0].refresh_from_db()
+        self.assertTrue(self.transfers[0].completed)
+        self.assertEqual(self.transfers[0].service_detail, "Success")
+
+    def test_batched_notifications(self):
+        """Test batched notifications reject transfers of other banks"""
+        res = self.post(
+            {
+                "notifications": [
+                    {"transfer": transfer.pk, "completed": True}
+                    for transfer in self.transfers
+                ]
+                + [
+                    {
+                        "transfer": self.foreign_transfer.pk,
+                        "completed": True,
+                    },
+                    {"transfer": 0, "completed": False, "detail": "Unknown"},
+                ]
+            }
+        )
+
+        self.assertEqual(res.status_code, 202)
+        self.assertEqual(
+            res.json(),
+            {"accepted": 3, "rejected": [0, self.foreign_transfer.pk]},
+        )
+        self.assertEqual(
+            TransferRequest.objects.filter(completed=True).count(), 3
+        )
+
+    def test_settled_transfers_rejected(self):
+        """Test notifications for completed or failed transfers are rejected
+        and leave them as they are"""
+        completed, failed = self.transfers[:2]
+        TransferRequest.objects.filter(pk=completed.pk).update(completed=True)
+        TransferRequest.objects.filter(pk=failed.pk).update(completed=False)
+
+        res = self.post(
+            [
+                {"transfer": completed.pk, "completed": False},
+                {"transfer": failed.pk, "completed": True},
+            ]
+        )
+
+        self.assertEqual(res.status_code, 202)
+        self.assertEqual(
+            res.json(),
+            {"accepted": 0, "rejected": sorted([completed.pk, failed.pk])},
+        )
+        completed.refresh_from_db()
+        failed.refresh_from_db()
+        self.assertTrue(completed.completed)
+        self.assertFalse(failed.completed)
+
+    def test_flush_skips_settled_transfers(self):
+        """Test a transfer settled after its notification was buffered is
+        left as it is"""
+        buffer = CallbackBuffer(delay=60)
+        buffer._start = lambda: None
+        buffer.add(self.transfers[0].pk, True, "Settled")
+        buffer.add(self.transfers[1].pk, True, "Settled")
+        TransferRequest.objects.filter(pk=self.transfers[0].pk).update(
+            completed=False
+        )
+
+        self.assertEqual(buffer.flush(), 1)
+        self.transfers[0].refresh_from_db()
+        self.assertFalse(self.transfers[0].completed)
+
+    def test_invalid_token(self):
+        """Test notifications need a bank token"""
+        res = self.post(
+            {"transfer": self.transfers[0].pk, "completed": True},
+            token="wrong",
+        )
+
+        self.assertEqual(res.status_code, 401)
+
+    def test_invalid_notification(self):
+        """Test malformed notifications are rejected"""
+        res = self.post([{"transfer": self.transfers[0].pk}])
+        self.assertEqual(res.status_code, 400)
+
+        res = self.post({"transfer": "x", "completed": "yes"})
+        self.assertEqual(res.status_code, 400)
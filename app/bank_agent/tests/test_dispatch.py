@@ -0,0 +1,116 @@
+import threading
+import time
+from unittest.mock import patch
+from uuid import uuid4
+
+from django.test import TestCase
+
+from bank_agent.dispatch import (
+    SENDING_DETAIL,
+    dispatch_many,
+    shard_by_source_account,
+)
+from bank_agent.models import Bank, TransferRequest
+from bank_agent.utils import sample_bank
+
+
+class DispatchManyTests(TestCase):
+    """Test the parallel bulk dispatcher"""
+
+    def setUp(self):
+        self.bank: Bank = sample_bank()
+        self.accounts = [uuid4() for _ in range(4)]
+        for index in range(12):
+            TransferRequest.objects.create(
+                source_bank=self.bank,
+                source_account_id=self.accounts[index % 4],
+                destination_bank=self.bank,
+                destination_account_id=uuid4(),
+                amount=index + 1,
+                info=str(index),
+            )
+
+    def test_shard_by_source_account(self):
+        """Test transfers are grouped per source account in order"""
+        transfers = list(TransferRequest.objects.order_by("created", "id"))
+        shards = shard_by_source_account(transfers)
+
+        self.assertEqual(len(shards), 4)
+        for shard in shards:
+            self.assertEqual(
+                len({transfer.source_account_id for transfer in shard}), 1
+            )
+            self.assertEqual(
+                [int(transfer.info) for transfer in shard],
+                sorted(int(transfer.info) for transfer in shard),
+            )
+
+    @patch("bank_agent.services.BankAppAPIClient.intra_bank_transfer_request")
+    def test_dispatch_many_keeps_per_account_order(self, intra_bank_service):
+        """Test transfers of one account are sent in creation order while
+        accounts run in parallel"""
+        calls = []
+        active = set()
+        overlapped = threading.Event()
+        lock = threading.Lock()
+
+        def transfer(source, destination, info, amount):
+            with lock:
+                calls.append((source, int(info)))
+                active.add(threading.get_ident())
+                if len(active) > 1:
+                    overlapped.set()
+            time.sleep(0.01)
+            with lock:
+                active.discard(threading.get_ident())
+            return (201, "Success") if int(info) % 2 else (400, "failed")
+
+        intra_bank_service.side_effect = transfer
+
+        results = dispatch_many(
+            TransferRequest.objects.all(), max_workers=4, batch_size=5
+        )
+
+        self.assertEqual(
+            results,
+            {"dispatched": 12, "completed": 6, "failed": 6, "unknown": 0},
+        )
+        self.assertTrue(overlapped.is_set())
+        for account in self.accounts:
+            infos = [info for source, info in calls if source == str(account)]
+            self.assertEqual(infos, sorted(infos))
+
+        self.assertEqual(
+            TransferRequest.objects.filter(completed=True).count(), 6
+        )
+        self.assertFalse(
+            TransferRequest.objects.filter(detail=None).exists()
+        )
+
+    @patch("bank_agent.services.BankAppAPIClient.intra_bank_transfer_request")
+    def test_dispatch_many_keeps_finished_outcomes_on_error(
+        self, intra_bank_service
+    ):
+        """Test outcomes already sent are saved when a transfer raises, the
+        transfer is left unknown and later transfers of the same account
+        are skipped and left unsent"""
+
+        def transfer(source, destination, info, amount):
+            if info == "7":
+                raise ValueError("bad response")
+            return (201, "Success")
+
+        intra_bank_service.side_effect = transfer
+
+        with self.assertRaises(ValueError):
+            dispatch_many(TransferRequest.objects.all(), max_workers=1)
+
+        self.assertEqual(
+            TransferRequest.objects.filter(completed=True).count(), 10
+        )
+        raised = TransferRequest.objects.get(info="7")
+        self.assertIsNone(raised.completed)
+        self.assertEqual(raised.service_detail, SENDING_DETAIL)
+        skipped = TransferRequest.objects.get(info="11")
+        self.assertFalse(skipped.completed)
+        self.assertIsNone(skipped.detail)
@@ -0,0 +1,273 @@
+import itertools
+import re
+from uuid import uuid4
+
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django_tables2 import RequestConfig
+
+from bank_agent.forms import TransferRequestFilterForm
+from bank_agent.models import Bank, TransferRequest
+from bank_agent.utils import sample_bank
+from bank_agent.views import TransferRequestTable
+
+
+INDEX_URL = reverse("bank_agent:index")
+
+
+class HistoryFilterTests(TestCase):
+    """Test the filters and orderings of the transfer history"""
+
+    def setUp(self):
+        self.bank_1: Bank = sample_bank()
+        self.bank_2: Bank = sample_bank()
+        self.account_id = uuid4()
+        self.transfers = [
+            TransferRequest.objects.create(
+                source_bank=self.bank_1,
+                source_account_id=self.account_id,
+                destination_bank=self.bank_2,
+                destination_account_id=uuid4(),
+                amount=amount,
+                info=f"transfer {amount}",
+                completed=completed,
+            )
+            for amount, completed in ((10, True), (20, False), (30, True))
+        ]
+        TransferRequest.objects.create(
+            source_bank=self.bank_2,
+            source_account_id=uuid4(),
+            destination_bank=self.bank_2,
+            destination_account_id=uuid4(),
+            amount=40,
+            info="transfer 40",
+        )
+        self.today = self.transfers[0].created.date().isoformat()
+
+    def filtered(self, **data):
+        form = TransferRequestFilterForm(data)
+        self.assertTrue(form.is_valid(), form.errors)
+        return sorted(
+            form.filter(TransferRequest.objects.all()).values_list(
+                "amount", flat=True
+            )
+        )
+
+    def test_filters(self):
+        """Test each filter narrows the history"""
+        self.assertEqual(
+            self.filtered(source_bank=self.bank_1.id), [10, 20, 30]
+        )
+        self.assertEqual(self.filtered(source_bank=self.bank_2.id), [40])
+        self.assertEqual(
+            len(self.filtered(destination_bank=self.bank_2.id)), 4
+        )
+        self.assertEqual(
+            self.filtered(source_account=self.account_id), [10, 20, 30]
+        )
+        self.assertEqual(
+            self.filtered(destination_account=self.account_id), []
+        )
+        self.assertEqual(self.filtered(status="completed"), [10, 30])
+        self.assertEqual(self.filtered(status="failed"), [20, 40])
+        self.assertEqual(self.filtered(status="unknown"), [])
+        self.assertEqual(
+            self.filtered(amount_min="15", amount_max="30"), [20, 30]
+        )
+        self.assertEqual(
+            len(self.filtered(date_from=self.today, date_to=self.today)), 4
+        )
+        self.assertEqual(self.filtered(date_from="2999-01-01"), [])
+
+    def test_orderings_follow_filters(self):
+        """Test only the orderings served by the filter index are allowed"""
+        orderings = {
+            (): ("amount", "created"),
+            (("amount_min", "1"),): ("amount",),
+            (("status", "failed"),): ("created",),
+            (("amount_min", "1"), ("date_from", self.today)): ("created",),
+        }
+
+        for data, expected in orderings.items():
+            with self.subTest(data=data):
+                form = TransferRequestFilterForm(dict(data))
+                self.assertTrue(form.is_valid(), form.errors)
+                self.assertEqual(form.orderings(), expected)
+
+    def test_view_filters_and_sorts(self):
+        """Test the history view applies filters and allowed orderings"""
+        res = self.client.get(
+            INDEX_URL, {"amount_min": "15", "sort": "-amount"}
+        )
+
+        self.assertEqual(res.status_code, 200)
+        rows = [row.record.amount for row in res.context["table"].page]
+        self.assertEqual(rows, [40, 30, 20])
+
+    def test_view_sorts_amount_range_by_amount(self):
+        """Test an amount range is listed in amount order by default"""
+        res = self.client.get(INDEX_URL, {"amount_max": "30"})
+
+        self.assertEqual(res.status_code, 200)
+        rows = [row.record.amount for row in res.context["table"].page]
+        self.assertEqual(rows, [10, 20, 30])
+
+    def test_view_ignores_unindexed_sort(self):
+        """Test sorting on a column without an index is ignored"""
+        for params in (
+            {"sort": "info"},
+            {"status": "failed", "sort": "amount"},
+        ):
+            with self.subTest(params=params):
+                res = self.client.get(INDEX_URL, params)
+
+                self.assertEqual(res.status_code, 200)
+                self.assertEqual(
+                    res.context["table"].data.data.query.order_by, ()
+                )
+
+    def test_page_ids_are_unique(self):
+        """Test the transfer form and the filters do not share element ids,
+        the bank pickers look their fields up by id"""
+        res = self.client.get(INDEX_URL)
+
+        ids = re.findall(r'\bid="([^"]+)"', res.content.decode())
+        self.assertIn("id_source_bank_value", ids)
+        self.assertIn("id_filter_source_bank_value", ids)
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_view_rejects_out_of_range_amount(self):
+        """Test an amount filter too large for the amount column is a form
+        error"""
+        res = self.client.get(INDEX_URL, {"amount_min": "1e400"})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("amount_min", res.context["filter_form"].errors)
+
+    def test_every_filter_and_sort_uses_an_index(self):
+        """Test the query plan of every allowed filter and sort searches an
+        index of the filters and reads it in order"""
+        filters = {
+            "source_bank": self.bank_1.id,
+            "destination_bank": self.bank_2.id,
+            "source_account": self.account_id,
+            "destination_account": self.account_id,
+            "status": "completed",
+            "amount": {"amount_min": "1", "amount_max": "100"},
+            "date": {"date_from": self.today, "date_to": self.today},
+        }
+        indexes = {
+            "source_bank": "transfer_src_bank_created_idx",
+            "destination_bank": "transfer_dst_bank_created_idx",
+            "source_account": "transfer_src_acct_created_idx",
+            "destination_account": "transfer_dst_acct_created_idx",
+            "status": "transfer_completed_created_idx",
+            "amount": "transfer_amount_created_idx",
+            "date": "bank_agent_transferrequest_created_",
+            "created": "bank_agent_transferrequest_created_",
+        }
+        cases = []
+        for count in range(len(filters) + 1):
+            for names in itertools.combinations(filters, count):
+                data = {}
+                for name in names:
+                    value = filters[name]
+                    data.update(
+                        value if isinstance(value, dict) else {name: value}
+                    )
+                cases.append((names, data))
+        # the other statuses compile to other comparisons
+        cases += [
+            (("status",), {"status": status})
+            for status in ("failed", "unknown")
+        ]
+
+        for names, data in cases:
+            form = TransferRequestFilterForm(data)
+            self.assertTrue(form.is_valid(), form.errors)
+
+            for column in form.orderings():
+                for ordering in (column, f"-{column}"):
+                    queryset = form.filter(
+                        TransferRequest.objects.select_related(
+                            "source_bank", "destination_bank"
+                        )
+                    ).order_by(ordering)[:25]
+                    plan = queryset.explain()
+                    table_steps = [
+                        line
+                        for line in plan.splitlines()
+                        if "bank_agent_transferrequest" in line
+                    ]
+
+                    with self.subTest(data=data, ordering=ordering):
+                        self.assertEqual(len(table_steps), 1, plan)
+                        self.assertNotIn("TEMP B-TREE", plan)
+                        if names:
+                            self.assertIn("SEARCH", table_steps[0], plan)
+                            expected = [indexes[name] for name in names]
+                        else:
+                            expected = [indexes[column]]
+                        self.assertTrue(
+                            any(
+                                f"USING INDEX {index}" in table_steps[0]
+                                for index in expected
+                            ),
+                            plan,
+                        )
+
+
+class HistoryRenderingTests(TestCase):
+    """Test the fast history rows render like django_tables2"""
+
+    def setUp(self):
+        bank_1 = sample_bank(name="<Bank & Co>")
+        bank_2 = sample_bank()
+        for amount in range(1, 31):
+            TransferRequest.objects.create(
+                source_bank=bank_1,
+                source_account_id=uuid4(),
+                destination_bank=bank_2 if amount % 3 else bank_1,
+                destination_account_id=uuid4(),
+                amount=amount * 1000 + 0.5,
+                info="" if amount % 4 else f"<b>rent</b> {amount}",
+                completed=None if amount % 7 == 0 else bool(amount % 2),
+                service_detail=None if amount % 5 else "Success",
+            )
+
+    def render(self, template_name=None, **params):
+        request = RequestFactory().get(INDEX_URL, params)
+        table = TransferRequestTable(
+            TransferRequest.objects.select_related(
+                "source_bank", "destination_bank"
+            ),
+            template_name=template_name,
+        )
+        RequestConfig(request, paginate={"per_page": 25}).configure(table)
+        html = table.as_html(request)
+        return re.sub(r">\s+<", "><", html).strip()
+
+    def test_same_html_as_django_tables2(self):
+        """Test every page and ordering renders the same markup"""
+        for params in ({}, {"page": 2}, {"sort": "amount"}):
+            with self.subTest(params=params):
+                self.assertEqual(
+                    self.render(**params),
+                    self.render("django_tables2/table.html", **params),
+                )
+
+    def test_escapes_values(self):
+        """Test values are escaped"""
+        html = self.render(sort="amount")
+
+        self.assertIn("&lt;Bank &amp; Co&gt;", html)
+        self.assertIn("&lt;b&gt;rent&lt;/b&gt; 4", html)
+        self.assertNotIn("<b>", html)
+
+    def test_empty_history(self):
+        """Test an empty history renders the same markup"""
+        TransferRequest.objects.all().delete()
+
+        self.assertEqual(
+            self.render(), self.render("django_tables2/table.html")
+        )
@@ -0,0 +1,93 @@
+from unittest.mock import MagicMock, patch
+
+import requests
+from django.test import SimpleTestCase
+
+from bank_agent.latency import LatencyEstimator
+from bank_agent.services import BankAppAPIClient
+
+
+class LatencyEstimatorTests(SimpleTestCase):
+    """Test the per bank latency based timeouts"""
+
+    def test_default_until_enough_samples(self):
+        """Test the default timeout is used for unknown banks"""
+        estimator = LatencyEstimator(default=10, min_samples=5)
+        for _ in range(4):
+            estimator.record("bank", "transfer", 0.1)
+
+        self.assertEqual(estimator.timeout("bank", "transfer"), 10)
+
+        estimator.record("bank", "transfer", 0.1)
+        self.assertAlmostEqual(estimator.timeout("bank", "transfer"), 0.5)
+
+    def test_timeout_per_bank_and_operation(self):
+        """Test fast and slow banks get their own timeouts"""
+        estimator = LatencyEstimator(
+            percentile=0.9, multiplier=2, floor=0.1, ceiling=30, min_samples=10
+        )
+        for index in range(10):
+            estimator.record("fast", "transfer", 0.1 + index / 100)
+            estimator.record("slow", "transfer", 2 + index / 10)
+
+        self.assertAlmostEqual(estimator.timeout("fast", "transfer"), 0.38)
+        self.assertAlmostEqual(estimator.timeout("slow", "transfer"), 5.8)
+        self.assertEqual(estimator.timeout("fast", "retire"), 10)
+
+    def test_timeout_bounds(self):
+        """Test the timeout stays within floor and ceiling"""
+        estimator = LatencyEstimator(floor=1, ceiling=5, min_samples=1)
+        estimator.record("fast", "add", 0.01)
+        estimator.record("slow", "add", 60)
+
+        self.assertEqual(estimator.timeout("fast", "add"), 1)
+        self.assertEqual(estimator.timeout("slow", "add"), 5)
+
+
+class ClientTimeoutTests(SimpleTestCase):
+    """Test timeouts on bank calls"""
+
+    def setUp(self):
+        self.estimator = LatencyEstimator(default=4, min_samples=1)
+        patcher = patch(
+            "bank_agent.services.latency_estimator", self.estimator
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.transport = MagicMock()
+        self.client = BankAppAPIClient(
+            "token", "http://bank/", "bank-id", "bank", self.transport
+        )
+
+    def test_timeout_passed_and_latency_recorded(self):
+        """Test the estimated timeout is used and the latency recorded"""
+        self.transport.put.return_value = MagicMock(status_code=201)
+
+        self.assertEqual(
+            self.client.retire_fund_request("a", "other", "rent", 10),
+            (201, "Success"),
+        )
+        self.assertEqual(self.transport.put.call_args.kwargs["timeout"], 4)
+        self.assertEqual(
+            self.estimator.timeout("bank-id", "retire"), self.estimator.floor
+        )
+
+    def test_timed_out_call(self):
+        """Test a timed out call is reported and recorded at its timeout"""
+        self.transport.put.side_effect = requests.exceptions.ReadTimeout()
+
+        self.assertEqual(
+            self.client.add_fund_request("a", "other", "rent", 10),
+            (504, "Service timed out."),
+        )
+        self.assertEqual(self.estimator.timeout("bank-id", "add"), 12)
+
+    def test_connect_timeout_is_not_sent(self):
+        """Test a bank that could not be reached is a failure, not an
+        unknown outcome"""
+        self.transport.put.side_effect = requests.exceptions.ConnectTimeout()
+
+        self.assertEqual(
+            self.client.add_fund_request("a", "other", "rent", 10),
+            (500, "Service timed out."),
+        )
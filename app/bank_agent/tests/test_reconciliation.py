@@ -0,0 +1,251 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from uuid import uuid4
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+
+from bank_agent.models import Bank, TransferRequest
+from bank_agent.reconciliation import partition_of
+from bank_agent.utils import sample_bank
+
+
+class ReconcileCommandTests(TestCase):
+    """Test the reconcile management command"""
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+        self.bank_1: Bank = sample_bank()
+        self.bank_2: Bank = sample_bank()
+
+    def sample_transfer(self, completed=True, amount=10, info="rent"):
+        transfer = TransferRequest.objects.create(
+            source_bank=self.bank_1,
+            source_account_id=uuid4(),
+            destination_bank=self.bank_2,
+            destination_account_id=uuid4(),
+            amount=amount,
+            info=info,
+            completed=completed,
+        )
+        transfer.date = transfer.created.date().isoformat()
+        return transfer
+
+    def write_statement(self, name, lines):
+        path = os.path.join(self.work_dir.name, name)
+        with open(path, "w") as statement:
+            if name.endswith(".csv"):
+                statement.write("bank,account,type,amount,date,info\n")
+                for line in lines:
+                    statement.write(
+                        ",".join(
+                            str(line[field])
+                            for field in (
+                                "bank", "account", "type", "amount", "date",
+                                "info",
+                            )
+                        )
+                        + "\n"
+                    )
+            else:
+                for line in lines:
+                    statement.write(json.dumps(line) + "\n")
+        return path
+
+    def line(self, bank, account, line_type, amount, date, info="rent"):
+        return {
+            "bank": str(bank.uuid),
+            "account": str(account),
+            "type": line_type,
+            "amount": str(amount),
+            "date": date,
+            "info": info,
+        }
+
+    def reconcile(self, *paths, workers=1):
+        output = os.path.join(self.work_dir.name, "report.jsonl")
+        stdout = StringIO()
+        call_command(
+            "reconcile",
+            *paths,
+            output=output,
+            partitions=4,
+            workers=workers,
+            stdout=stdout,
+        )
+        with open(output) as report:
+            return [json.loads(line) for line in report], stdout.getvalue()
+
+    def test_reconcile_statuses(self):
+        """Test every status is reported from CSV and JSONL statements"""
+        matched = self.sample_transfer()
+        mismatched = self.sample_transfer(amount=20)
+        missing = self.sample_transfer()
+        failed = self.sample_transfer(completed=False)
+        date = matched.date
+
+        source_statement = self.write_statement(
+            "bank_1.csv",
+            [
+                self.line(
+                    self.bank_1, matched.source_account_id, "debit", 10, date
+                ),
+                self.line(
+                    self.bank_1, mismatched.source_account_id, "debit", 25,
+                    date,
+                ),
+                self.line(
+                    self.bank_1, missing.source_account_id, "debit", 10, date
+                ),
+                self.line(
+                    self.bank_1, failed.source_account_id, "debit", 10, date
+                ),
+                self.line(
+                    self.bank_1, failed.source_account_id, "reversal", 10,
+                    date,
+                ),
+                self.line(self.bank_1, uuid4(), "reversal", 5, date),
+            ],
+        )
+        destination_statement = self.write_statement(
+            "bank_2.jsonl",
+            [
+                self.line(
+                    self.bank_2, matched.destination_account_id, "credit",
+                    "10.00", date,
+                ),
+                self.line(
+                    self.bank_2, mismatched.destination_account_id, "credit",
+                    20, date,
+                ),
+                self.line(self.bank_2, uuid4(), "credit", 7, date),
+            ],
+        )
+
+        report, stdout = self.reconcile(
+            source_statement, destination_statement, workers=2
+        )
+
+        statuses = {}
+        for entry in report:
+            statuses.setdefault(entry["status"], []).append(entry)
+        self.assertEqual(len(statuses["matched"]), 6)
+        self.assertEqual(len(statuses["amount_mismatch"]), 1)
+        self.assertEqual(
+            statuses["amount_mismatch"][0]["transfer"], mismatched.id
+        )
+        self.assertEqual(len(statuses["missing"]), 1)
+        self.assertEqual(statuses["missing"][0]["transfer"], missing.id)
+        self.assertEqual(statuses["missing"][0]["type"], "credit")
+        self.assertEqual(len(statuses["orphan_reversal"]), 1)
+        self.assertEqual(len(statuses["unexpected"]), 1)
+        self.assertIn("matched: 6", stdout)
+
+    def test_half_booked_reversal_is_missing(self):
+        """Test a retired fund without its reversal is reported"""
+        failed = self.sample_transfer(completed=False)
+        untouched = self.sample_transfer(completed=False)
+        statement = self.write_statement(
+            "bank_1.jsonl",
+            [
+                self.line(
+                    self.bank_1, failed.source_account_id, "debit", 10,
+                    failed.date,
+                ),
+            ],
+        )
+
+        report, _ = self.reconcile(statement)
+
+        missing = [entry for entry in report if entry["status"] == "missing"]
+        self.assertEqual(len(missing), 1)
+        self.assertEqual(missing[0]["transfer"], failed.id)
+        self.assertEqual(missing[0]["type"], "reversal")
+        self.assertNotIn(
+            untouched.id, [entry.get("transfer") for entry in report]
+        )
+
+    def test_unknown_outcome_debit_without_credit(self):
+        """Test a transfer whose outcome is unknown reports nothing when
+        no leg was booked and the missing credit when only the debit was,
+        though they are in different partitions"""
+        booked = self.sample_transfer(completed=None)
+        untouched = self.sample_transfer(completed=None)
+        statement = self.write_statement(
+            "bank_1.jsonl",
+            [
+                self.line(
+                    self.bank_1, booked.source_account_id, "debit", 10,
+                    booked.date,
+                ),
+            ],
+        )
+
+        report, _ = self.reconcile(statement, workers=2)
+
+        self.assertEqual(
+            sorted(
+                (entry["status"], entry["type"], entry["transfer"])
+                for entry in report
+            ),
+            [
+                ("matched", "debit", booked.id),
+                ("missing", "credit", booked.id),
+            ],
+        )
+        self.assertNotIn(
+            untouched.id, [entry.get("transfer") for entry in report]
+        )
+
+    def test_empty_statements_from_date_only(self):
+        """Test --from without --to reconciles up to today when the
+        statements have no lines"""
+        transfer = self.sample_transfer()
+        statement = self.write_statement("empty.jsonl", [])
+
+        report, _ = self.reconcile(statement, "--from", transfer.date)
+
+        self.assertEqual(
+            [(entry["status"], entry["transfer"]) for entry in report],
+            [("missing", transfer.id)] * 2,
+        )
+
+    def test_malformed_statement_lines(self):
+        """Test a line that can not be parsed names the file and line"""
+        valid = json.dumps(
+            self.line(self.bank_1, uuid4(), "debit", 10, "2026-01-01")
+        )
+        statements = {
+            "broken.jsonl": f"{valid}\n{{not json\n",
+            "list.jsonl": f"{valid}\n[1, 2]\n",
+            "short.csv": "bank,account,type,amount,date,info\nb,a\n",
+        }
+
+        for name, content in statements.items():
+            with self.subTest(name=name):
+                path = os.path.join(self.work_dir.name, name)
+                with open(path, "w") as statement:
+                    statement.write(content)
+
+                with self.assertRaisesRegex(CommandError, f"{path}:2: "):
+                    self.reconcile(path)
+
+
+class PartitionTests(SimpleTestCase):
+    """Test how lines are spread over partitions"""
+
+    def test_busy_bank_day_is_spread_over_partitions(self):
+        """Test the lines of one bank and date go to several partitions"""
+        bank = str(uuid4())
+        partitions = {
+            partition_of(
+                {"bank": bank, "account": str(uuid4()), "date": "2026-01-01"},
+                16,
+            )
+            for _ in range(200)
+        }
+
+        self.assertEqual(len(partitions), 16)
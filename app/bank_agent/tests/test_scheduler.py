@@ -0,0 +1,205 @@
+import datetime
+import threading
+from unittest.mock import patch
+from uuid import uuid4
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from bank_agent.dispatch import SENDING_DETAIL
+from bank_agent.models import (
+    Bank,
+    ScheduledTransfer,
+    TransferRequest,
+    add_months,
+)
+from bank_agent.scheduler import Scheduler
+from bank_agent.services import BankAppAPIClient
+from bank_agent.utils import sample_bank
+
+
+class AddMonthsTests(SimpleTestCase):
+    def test_add_months_clamps_day(self):
+        """Test adding a month to the end of a month"""
+        self.assertEqual(
+            add_months(datetime.datetime(2024, 1, 31), 1),
+            datetime.datetime(2024, 2, 29),
+        )
+        self.assertEqual(
+            add_months(datetime.datetime(2024, 12, 15), 1),
+            datetime.datetime(2025, 1, 15),
+        )
+
+
+@patch(
+    "bank_agent.services.BankAppAPIClient.intra_bank_transfer_request",
+    return_value=(201, "Success"),
+)
+class SchedulerTests(TestCase):
+    """Test expanding scheduled transfers"""
+
+    def setUp(self):
+        self.bank: Bank = sample_bank()
+        self.now = timezone.now()
+
+    def sample_schedule(self, due_at, recurrence=ScheduledTransfer.ONCE, **kw):
+        kw.setdefault("destination_bank", self.bank)
+        return ScheduledTransfer.objects.create(
+            source_bank=self.bank,
+            source_account_id=uuid4(),
+            destination_account_id=uuid4(),
+            amount=10,
+            info="standing order",
+            recurrence=recurrence,
+            due_at=due_at,
+            **kw,
+        )
+
+    def test_catch_up_expands_missed_occurrences(self, intra_bank_service):
+        """Test every missed occurrence is sent after downtime"""
+        daily = self.sample_schedule(
+            self.now - datetime.timedelta(days=4, hours=1),
+            ScheduledTransfer.DAILY,
+        )
+        once = self.sample_schedule(self.now - datetime.timedelta(hours=1))
+        future = self.sample_schedule(self.now + datetime.timedelta(days=1))
+
+        sent = Scheduler(batch_size=2).catch_up()
+
+        self.assertEqual(sent, 6)
+        self.assertEqual(intra_bank_service.call_count, 6)
+        self.assertEqual(
+            TransferRequest.objects.filter(completed=True).count(), 6
+        )
+        daily.refresh_from_db()
+        once.refresh_from_db()
+        future.refresh_from_db()
+        self.assertGreater(daily.due_at, self.now)
+        self.assertIsNone(once.due_at)
+        self.assertIsNotNone(future.due_at)
+
+    def test_recurrence_stops_at_ends_at(self, intra_bank_service):
+        """Test a recurring schedule ends after its last occurrence"""
+        schedule = self.sample_schedule(
+            self.now - datetime.timedelta(weeks=3),
+            ScheduledTransfer.WEEKLY,
+            ends_at=self.now - datetime.timedelta(weeks=1),
+        )
+
+        sent = Scheduler().catch_up()
+
+        self.assertEqual(sent, 3)
+        schedule.refresh_from_db()
+        self.assertIsNone(schedule.due_at)
+
+    def test_monthly_keeps_day_of_month(self, intra_bank_service):
+        """Test a monthly schedule on the 31st goes back to the 31st after
+        shorter months"""
+        schedule = self.sample_schedule(
+            datetime.datetime(2025, 1, 31, 9, tzinfo=datetime.timezone.utc),
+            ScheduledTransfer.MONTHLY,
+        )
+
+        due_dates = []
+        for _ in range(6):
+            schedule.due_at = schedule.next_due_at()
+            due_dates.append(schedule.due_at.date())
+
+        self.assertEqual(
+            due_dates,
+            [
+                datetime.date(2025, 2, 28),
+                datetime.date(2025, 3, 31),
+                datetime.date(2025, 4, 30),
+                datetime.date(2025, 5, 31),
+                datetime.date(2025, 6, 30),
+                datetime.date(2025, 7, 31),
+            ],
+        )
+
+    def test_run_pending_sends_due_heap_items(self, intra_bank_service):
+        """Test the heap only sends schedules that are due"""
+        due = self.sample_schedule(self.now - datetime.timedelta(seconds=1))
+        later = self.sample_schedule(self.now + datetime.timedelta(minutes=1))
+        self.sample_schedule(self.now + datetime.timedelta(days=1))
+        scheduler = Scheduler()
+
+        scheduler.refresh()
+        self.assertEqual(len(scheduler._heap), 2)
+        self.assertEqual(scheduler.run_pending(), 1)
+
+        due.refresh_from_db()
+        self.assertIsNone(due.due_at)
+        self.assertEqual(scheduler._heap, [(later.due_at, later.pk)])
+        self.assertGreater(scheduler.seconds_until_next(), 0)
+
+    def test_undispatched_transfers_sent_on_next_pass(
+        self, intra_bank_service
+    ):
+        """Test occurrences expanded by a pass that stopped before sending
+        them are sent by the next pass"""
+        schedule = self.sample_schedule(self.now - datetime.timedelta(hours=1))
+        schedule.expand()
+        schedule.refresh_from_db()
+        self.assertIsNone(schedule.due_at)
+
+        self.assertEqual(Scheduler().catch_up(), 1)
+        self.assertEqual(Scheduler().catch_up(), 0)
+        transfer = TransferRequest.objects.get()
+        self.assertTrue(transfer.completed)
+        self.assertEqual(transfer.schedule, schedule)
+        self.assertEqual(intra_bank_service.call_count, 1)
+
+    def test_raised_transfer_not_sent_again(self, intra_bank_service):
+        """Test a transfer whose send raised after the source bank retired
+        the funds is left unknown and the other schedules still run"""
+        self.sample_schedule(
+            self.now - datetime.timedelta(hours=1),
+            destination_bank=sample_bank(),
+        )
+        scheduler = Scheduler()
+
+        with patch.object(
+            BankAppAPIClient,
+            "retire_fund_request",
+            return_value=(201, "Success"),
+        ) as retire, patch.object(
+            BankAppAPIClient,
+            "add_fund_request",
+            side_effect=ValueError("not JSON"),
+        ):
+            with self.assertLogs("bank_agent.dispatch", "ERROR"):
+                self.assertEqual(scheduler.catch_up(), 1)
+            later = self.sample_schedule(
+                self.now - datetime.timedelta(minutes=1)
+            )
+            for _ in range(2):
+                scheduler.catch_up()
+
+        self.assertEqual(retire.call_count, 1)
+        transfer = TransferRequest.objects.exclude(schedule=later).get()
+        self.assertIsNone(transfer.completed)
+        self.assertEqual(transfer.service_detail, SENDING_DETAIL)
+        self.assertTrue(
+            TransferRequest.objects.get(schedule=later).completed
+        )
+
+    def test_run_forever_survives_failed_pass(self, intra_bank_service):
+        """Test the loop logs a failed pass and keeps running"""
+        scheduler = Scheduler()
+        scheduler.retry_delay = 0
+        stop = threading.Event()
+        passes = []
+
+        def catch_up():
+            passes.append(1)
+            if len(passes) == 1:
+                raise RuntimeError("bank exploded")
+            stop.set()
+            return 0
+
+        with patch.object(scheduler, "catch_up", side_effect=catch_up):
+            with self.assertLogs("bank_agent.scheduler", "ERROR"):
+                scheduler.run_forever(stop)
+
+        self.assertEqual(len(passes), 2)
@@ -0,0 +1,358 @@
+import json
+import threading
+import time
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+import requests
+from django.test import SimpleTestCase, TestCase
+
+from bank_agent.account_cache import invalid_accounts
+from bank_agent.models import Bank, TransferRequest
+from bank_agent.services import BankAppAPIClient
+from bank_agent.settlement import SettlementBatcher
+from bank_agent.transports import ReplayResponse
+from bank_agent.utils import sample_bank
+
+
+def bank_response(operation, account_id, bank_id, info, amount):
+    """Bank answer to a retire or add request depending on the info"""
+    if operation == "retire" and info == "retire fails":
+        return (400, "source: Insufficient funds")
+    if operation == "add" and info == "add fails":
+        return (500, "Service is unavailable")
+    if operation == "add" and info == "add times out":
+        return (504, "Service timed out.")
+    return (201, "Success")
+
+
+class SettlementTests(TestCase):
+    """Test batched inter-bank settlement"""
+
+    def setUp(self):
+        self.source_bank: Bank = sample_bank()
+        self.destination_bank: Bank = sample_bank()
+        self.transfers = [
+            TransferRequest.objects.create(
+                source_bank=self.source_bank,
+                source_account_id=uuid4(),
+                destination_bank=self.destination_bank,
+                destination_account_id=uuid4(),
+                amount=index + 1,
+                info=info,
+            )
+            for index, info in enumerate(
+                ["ok", "retire fails", "add fails", "ok", "add fails"]
+            )
+        ]
+        self.calls = []
+
+        for operation in ("retire", "add"):
+            patcher = patch.object(
+                BankAppAPIClient,
+                f"{operation}_fund_request",
+                side_effect=self.single_request(operation),
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        patcher = patch.object(
+            BankAppAPIClient,
+            "batch_fund_request",
+            side_effect=self.batch_request,
+        )
+        self.batch_fund_request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def single_request(self, operation):
+        def request(*args):
+            self.calls.append((operation, args))
+            return bank_response(operation, *args)
+
+        return request
+
+    def batch_request(self, operation, fund_requests):
+        return [
+            self.single_request(operation)(*args) for args in fund_requests
+        ]
+
+    def send_all(self, batcher: SettlementBatcher):
+        """Sends every transfer from its own thread"""
+        with patch("bank_agent.models.settlement_batcher", batcher):
+            threads = [
+                threading.Thread(
+                    target=transfer.send_request_to_banks,
+                    kwargs={"commit": False},
+                )
+                for transfer in self.transfers
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        return [
+            (transfer.completed, transfer.service_detail)
+            for transfer in self.transfers
+        ]
+
+    def reset(self):
+        self.calls.clear()
+        self.batch_fund_request.reset_mock()
+        for transfer in self.transfers:
+            transfer.completed = False
+            transfer.service_detail = None
+
+    def test_same_outcomes_and_calls_as_per_transfer(self):
+        """Test batched settlement sends the same retire, add and reversal
+        requests and gets the same outcomes as per-transfer calls"""
+        self.source_bank.supports_batch = True
+        self.destination_bank.supports_batch = True
+        per_transfer = self.send_all(SettlementBatcher(window=0))
+        per_transfer_calls = sorted(self.calls)
+        self.assertEqual(self.batch_fund_request.call_count, 0)
+
+        self.reset()
+        batched = self.send_all(SettlementBatcher(window=10, max_size=5))
+
+        self.assertEqual(batched, per_transfer)
+        self.assertEqual(
+            [completed for completed, _ in batched],
+            [True, False, False, True, False],
+        )
+        self.assertEqual(sorted(self.calls), per_transfer_calls)
+        # one retire batch, one add batch and one reversal batch
+        self.assertEqual(
+            [call.args[0] for call in self.batch_fund_request.mock_calls],
+            ["retire", "add", "add"],
+        )
+        self.assertEqual(
+            len(self.batch_fund_request.mock_calls[2].args[1]), 2
+        )
+
+    def test_reversal_credits_source_account(self):
+        """Test a failed add is reversed to the source account on behalf of
+        the destination bank"""
+        transfer = self.transfers[2]
+        account_id = str(transfer.source_account_id)
+        self.send_all(SettlementBatcher(window=0))
+
+        reversals = [
+            args
+            for operation, args in self.calls
+            if operation == "add" and args[0] == account_id
+        ]
+        self.assertEqual(
+            reversals,
+            [
+                (
+                    account_id,
+                    str(self.destination_bank.uuid),
+                    transfer.info,
+                    transfer.amount,
+                )
+            ],
+        )
+
+    def test_unknown_add_outcome_not_reversed(self):
+        """Test a transfer whose add timed out is not reversed and is left
+        unknown, batched or not"""
+        self.source_bank.supports_batch = True
+        self.destination_bank.supports_batch = True
+        self.transfers[4].info = "add times out"
+
+        for batcher in (
+            SettlementBatcher(window=0),
+            SettlementBatcher(window=10, max_size=5),
+        ):
+            with self.subTest(window=batcher.window):
+                self.reset()
+                outcomes = self.send_all(batcher)
+
+                self.assertEqual(
+                    [completed for completed, _ in outcomes],
+                    [True, False, False, True, None],
+                )
+                # four adds to the destination bank and one reversal
+                adds = [call for call in self.calls if call[0] == "add"]
+                self.assertEqual(len(adds), 5)
+
+    def test_fallback_for_banks_without_batch_support(self):
+        """Test requests to a bank without batch support are sent one by
+        one"""
+        self.source_bank.supports_batch = True
+
+        outcomes = self.send_all(SettlementBatcher(window=10, max_size=5))
+
+        self.assertEqual(
+            [completed for completed, _ in outcomes],
+            [True, False, False, True, False],
+        )
+        self.assertEqual(
+            [call.args[0] for call in self.batch_fund_request.mock_calls],
+            ["retire", "add"],
+        )
+        # four adds to the destination bank and two reversals
+        adds = [call for call in self.calls if call[0] == "add"]
+        self.assertEqual(len(adds), 6)
+
+    def test_not_batched_when_no_bank_supports_it(self):
+        """Test transfers between banks without batch support do not wait
+        for a window"""
+        started = time.perf_counter()
+        outcomes = self.send_all(SettlementBatcher(window=10, max_size=5))
+
+        self.assertLess(time.perf_counter() - started, 5)
+        self.assertEqual(self.batch_fund_request.call_count, 0)
+        self.assertEqual(outcomes[0], (True, "Success"))
+
+
+class SettlementBatcherTests(SimpleTestCase):
+    """Test settlement windows"""
+
+    def settle_concurrently(self, batcher, transfers):
+        outcomes = {}
+
+        def settle(transfer):
+            outcomes[transfer.pk] = batcher.settle(transfer)
+
+        threads = [
+            threading.Thread(target=settle, args=(transfer,))
+            for transfer in transfers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def transfer(self, pk, source_bank_id=1, destination_bank_id=2):
+        return TransferRequest(
+            pk=pk,
+            source_bank_id=source_bank_id,
+            destination_bank_id=destination_bank_id,
+        )
+
+    @patch("bank_agent.settlement.settle_transfers")
+    def test_batch_per_bank_pair(self, settle_transfers):
+        """Test transfers are batched per bank pair and a full batch does
+        not wait for the end of its window"""
+        settle_transfers.side_effect = lambda transfers: [
+            (201, f"Success {transfer.pk}") for transfer in transfers
+        ]
+        batcher = SettlementBatcher(window=10, max_size=3)
+        transfers = [self.transfer(pk) for pk in range(3)]
+
+        started = time.perf_counter()
+        outcomes = self.settle_concurrently(batcher, transfers)
+
+        self.assertLess(time.perf_counter() - started, 5)
+        self.assertEqual(settle_transfers.call_count, 1)
+        self.assertEqual(
+            outcomes, {pk: (201, f"Success {pk}") for pk in range(3)}
+        )
+
+        settle_transfers.reset_mock()
+        batcher = SettlementBatcher(window=0.05, max_size=10)
+        outcomes = self.settle_concurrently(
+            batcher, [self.transfer(1, 1, 2), self.transfer(2, 2, 1)]
+        )
+
+        self.assertEqual(settle_transfers.call_count, 2)
+        self.assertEqual(len(outcomes), 2)
+
+    @patch("bank_agent.settlement.settle_transfers")
+    def test_error_raised_for_every_transfer(self, settle_transfers):
+        """Test an error settling a batch is raised to every caller"""
+        settle_transfers.side_effect = RuntimeError("bank exploded")
+        batcher = SettlementBatcher(window=10, max_size=2)
+        errors = []
+
+        def settle(transfer):
+            try:
+                batcher.settle(transfer)
+            except RuntimeError as exc:
+                errors.append(exc)
+
+        threads = [
+            threading.Thread(target=settle, args=(self.transfer(pk),))
+            for pk in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(errors), 2)
+
+
+class BatchFundRequestTests(SimpleTestCase):
+    """Test batched bank operations"""
+
+    def setUp(self):
+        invalid_accounts.clear()
+        self.addCleanup(invalid_accounts.clear)
+        self.transport = MagicMock()
+        self.client = BankAppAPIClient(
+            "token", "http://bank/", "bank-id", "bank", self.transport
+        )
+        self.fund_requests = [
+            ("account-1", "other-bank", "rent", 10),
+            ("account-2", "other-bank", "rent", 20),
+        ]
+
+    def test_results_per_operation(self):
+        """Test each operation gets its own outcome"""
+        self.transport.put.return_value = ReplayResponse(
+            207,
+            json.dumps(
+                {
+                    "results": [
+                        {"status": 201},
+                        {
+                            "status": 400,
+                            "errors": {"source": ["Account does not exist"]},
+                        },
+                    ]
+                }
+            ),
+        )
+
+        outcomes = self.client.batch_fund_request(
+            "retire", self.fund_requests
+        )
+
+        self.assertEqual(
+            outcomes,
+            [(201, "Success"), (400, "source: Account does not exist")],
+        )
+        url, _, data = self.transport.put.call_args.args
+        self.assertEqual(url, "http://bank/retire/batch/")
+        self.assertEqual(
+            json.loads(data["operations"])[1],
+            {
+                "source": "account-2",
+                "dst_bank": "other-bank",
+                "info": "rent",
+                "amount": "20",
+            },
+        )
+        self.assertIsNotNone(invalid_accounts.get("bank-id", "account-2"))
+
+    def test_batch_failure(self):
+        """Test a batch without results fails every operation, with an
+        unknown outcome when the bank may have applied it"""
+        self.transport.put.side_effect = requests.exceptions.ReadTimeout()
+        self.assertEqual(
+            self.client.batch_fund_request("add", self.fund_requests),
+            [(504, "Service timed out.")] * 2,
+        )
+
+        self.transport.put.side_effect = None
+        self.transport.put.return_value = ReplayResponse(
+            201, json.dumps({"results": [{"status": 201}]})
+        )
+        self.assertEqual(
+            self.client.batch_fund_request("add", self.fund_requests),
+            [(504, "Service is unavailable")] * 2,
+        )
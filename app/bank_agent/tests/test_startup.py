@@ -0,0 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+
+CHECK_MODULES_SCRIPT = """
+import json, sys
+import django
+django.setup()
+import bank_agent.models
+print(json.dumps(sorted(
+    name for name in ("requests", "django_tables2", "django.contrib.admin")
+    if name in sys.modules
+)))
+"""
+
+
+class StartupTests(SimpleTestCase):
+    """Test the modules loaded at startup by each settings profile"""
+
+    def loaded_modules(self, settings_module):
+        env = dict(os.environ)
+        env["DJANGO_SETTINGS_MODULE"] = settings_module
+        env.setdefault("SECRET_KEY", "test")
+        output = subprocess.run(
+            [sys.executable, "-c", CHECK_MODULES_SCRIPT],
+            cwd=settings.BASE_DIR,
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        return json.loads(output)
+
+    def test_models_do_not_import_requests(self):
+        """Test loading the models does not import the http client"""
+        self.assertNotIn("requests", self.loaded_modules("app.settings"))
+
+    def test_worker_profile_skips_web_apps(self):
+        """Test the worker profile does not load web only apps"""
+        self.assertEqual(self.loaded_modules("app.settings_worker"), [])
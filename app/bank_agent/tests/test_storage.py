@@ -0,0 +1,118 @@
+from decimal import Decimal
+from uuid import uuid4
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase
+
+from bank_agent.models import Bank, ServiceDetail, TransferRequest
+from bank_agent.utils import sample_bank
+
+
+class CompactStorageTests(TestCase):
+    """Test amounts are stored as minor units and service details are
+    interned"""
+
+    def setUp(self):
+        self.bank: Bank = sample_bank()
+
+    def create_transfer(self, amount, **kwargs) -> TransferRequest:
+        return TransferRequest.objects.create(
+            source_bank=self.bank,
+            source_account_id=uuid4(),
+            destination_bank=self.bank,
+            destination_account_id=uuid4(),
+            amount=amount,
+            info="test info",
+            **kwargs,
+        )
+
+    def stored(self, column: str, transfer: TransferRequest):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {column} FROM bank_agent_transferrequest "
+                "WHERE id = %s",
+                [transfer.pk],
+            )
+            return cursor.fetchone()[0]
+
+    def test_amount_stored_as_minor_units(self):
+        """Test amounts are integers in the database and Decimal in
+        Python"""
+        transfer = self.create_transfer(Decimal("1234.56"))
+        transfer.refresh_from_db()
+
+        self.assertEqual(self.stored("amount", transfer), 123456)
+        self.assertEqual(transfer.amount, Decimal("1234.56"))
+        self.assertIsInstance(transfer.amount, Decimal)
+
+    def test_amount_lookups_and_sum(self):
+        """Test lookups take amounts and sums are exact amounts"""
+        for amount in ("0.10", "0.20", "10", "15.5"):
+            self.create_transfer(Decimal(amount))
+
+        self.assertEqual(
+            TransferRequest.objects.filter(amount__gte="10").count(), 2
+        )
+        self.assertEqual(
+            TransferRequest.objects.aggregate(total=Sum("amount"))["total"],
+            Decimal("25.80"),
+        )
+        self.assertEqual(
+            list(
+                TransferRequest.objects.order_by("amount").values_list(
+                    "amount", flat=True
+                )
+            ),
+            [Decimal("0.10"), Decimal("0.20"), Decimal("10"), Decimal("15.5")],
+        )
+
+    def test_amount_with_more_decimal_places_rejected(self):
+        """Test amounts are never rounded to fit in minor units"""
+        transfer = TransferRequest(
+            source_bank=self.bank,
+            source_account_id=uuid4(),
+            destination_bank=self.bank,
+            destination_account_id=uuid4(),
+            amount=Decimal("10.005"),
+            info="test info",
+        )
+
+        with self.assertRaises(ValidationError):
+            transfer.full_clean()
+        with self.assertRaises(ValueError):
+            transfer.save()
+
+    def test_service_detail_interned(self):
+        """Test each distinct message is stored once"""
+        first = self.create_transfer(10, service_detail="Success")
+        second = self.create_transfer(20, service_detail="Success")
+        failed = self.create_transfer(30, service_detail="Service timed out.")
+        pending = self.create_transfer(40)
+
+        self.assertEqual(ServiceDetail.objects.count(), 2)
+        self.assertEqual(first.detail_id, second.detail_id)
+        self.assertIsNone(pending.detail_id)
+
+        for transfer in (first, failed, pending):
+            transfer = TransferRequest.objects.get(pk=transfer.pk)
+            self.assertEqual(
+                transfer.service_detail,
+                {first: "Success", failed: "Service timed out."}.get(
+                    transfer
+                ),
+            )
+
+    def test_service_detail_set_without_save(self):
+        """Test a message set on a transfer is only stored when saved"""
+        transfer = self.create_transfer(10)
+
+        transfer.service_detail = "Success"
+        self.assertEqual(transfer.service_detail, "Success")
+        self.assertFalse(ServiceDetail.objects.exists())
+
+        transfer.save()
+        transfer.refresh_from_db()
+        self.assertEqual(transfer.service_detail, "Success")
+        self.assertEqual(ServiceDetail.objects.get().text, "Success")
@@ -0,0 +1,191 @@
+import json
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+import requests
+from django.test import SimpleTestCase, TestCase
+
+from bank_agent.models import Bank, TransferRequest
+from bank_agent.services import BankAppAPIClient
+from bank_agent.transports import (
+    RecordingTransport,
+    ReplayMissError,
+    ReplayTransport,
+)
+from bank_agent.utils import sample_bank
+
+
+def sample_response(status_code, payload):
+    """Create a sample requests response"""
+    res = MagicMock(status_code=status_code, text=json.dumps(payload))
+    res.json.return_value = payload
+    return res
+
+
+class TransportTestMixin:
+    def setUp(self):
+        super().setUp()
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        self.log_path = os.path.join(work_dir.name, "traffic.jsonl")
+
+
+class RecordReplayTests(TransportTestMixin, SimpleTestCase):
+    """Test recording and replaying bank traffic"""
+
+    def record(self, responses):
+        inner = MagicMock()
+        inner.put.side_effect = responses
+        client = BankAppAPIClient(
+            "token",
+            "http://bank/",
+            "bank-id",
+            "bank",
+            transport=RecordingTransport(self.log_path, inner),
+        )
+        return client, [
+            client.intra_bank_transfer_request("a", "b", "rent", 10),
+            client.retire_fund_request("a", "other-bank", "rent", 10),
+            client.add_fund_request("b", "other-bank", "rent", 10),
+        ]
+
+    def test_record_writes_log_without_token(self):
+        """Test every request is appended to the log without the token"""
+        self.record(
+            [
+                sample_response(201, {}),
+                sample_response(400, {"source": ["Not enough fund"]}),
+                requests.exceptions.ConnectionError(),
+            ]
+        )
+
+        with open(self.log_path) as log:
+            records = [json.loads(line) for line in log]
+
+        self.assertEqual(
+            [record["status"] for record in records], [201, 400, None]
+        )
+        self.assertEqual(records[0]["url"], "http://bank/transfer/")
+        self.assertEqual(records[1]["data"]["amount"], "10")
+        self.assertNotIn("token", json.dumps(records))
+
+    def test_replay_returns_recorded_results(self):
+        """Test replayed requests give the recorded results"""
+        _, recorded = self.record(
+            [
+                sample_response(201, {}),
+                sample_response(400, {"source": ["Not enough fund"]}),
+                requests.exceptions.ConnectionError(),
+            ]
+        )
+        client = BankAppAPIClient(
+            "token",
+            "http://bank/",
+            "bank-id",
+            "bank",
+            transport=ReplayTransport(self.log_path, speed=0),
+        )
+
+        replayed = [
+            client.intra_bank_transfer_request("a", "b", "rent", 10),
+            client.retire_fund_request("a", "other-bank", "rent", 10),
+            client.add_fund_request("b", "other-bank", "rent", 10),
+        ]
+
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(
+            replayed[2], (500, "Service is unavailable.")
+        )
+
+    def test_replay_miss(self):
+        """Test an unrecorded request raises in exact mode"""
+        self.record([sample_response(201, {})] * 3)
+        transport = ReplayTransport(self.log_path, speed=0)
+
+        with self.assertRaises(ReplayMissError):
+            transport.put("http://bank/transfer/", {}, {"amount": 20})
+
+    @patch("bank_agent.transports.time.sleep")
+    def test_replay_speed(self, sleep):
+        """Test the recorded latency is scaled by the replay speed"""
+        with open(self.log_path, "w") as log:
+            log.write(
+                json.dumps(
+                    {
+                        "url": "http://bank/transfer/",
+                        "data": {},
+                        "latency": 0.5,
+                        "status": 201,
+                        "body": "{}",
+                    }
+                )
+                + "\n"
+            )
+
+        ReplayTransport(self.log_path, speed=2).put(
+            "http://bank/transfer/", {}, {}
+        )
+
+        sleep.assert_called_once_with(0.25)
+
+    @patch("bank_agent.transports.time.sleep")
+    def test_replay_timeout(self, sleep):
+        """Test recorded responses slower than the timeout time out"""
+        with open(self.log_path, "w") as log:
+            log.write(
+                json.dumps(
+                    {
+                        "url": "http://bank/transfer/",
+                        "data": {},
+                        "latency": 3,
+                        "status": 201,
+                        "body": "{}",
+                    }
+                )
+                + "\n"
+            )
+
+        with self.assertRaises(requests.exceptions.Timeout):
+            ReplayTransport(self.log_path).put(
+                "http://bank/transfer/", {}, {}, timeout=1
+            )
+        sleep.assert_called_once_with(1)
+
+
+class ReplayTransferTests(TransportTestMixin, TestCase):
+    """Test transfers against replayed traffic"""
+
+    @patch("requests.put")
+    def test_send_request_to_banks_with_operation_replay(self, put):
+        """Test recorded traffic is replayed for new transfers"""
+        put.side_effect = [sample_response(201, {}), sample_response(201, {})]
+        source_bank: Bank = sample_bank()
+        destination_bank: Bank = sample_bank()
+        recorder = RecordingTransport(self.log_path)
+
+        with patch(
+            "bank_agent.services.get_transport", return_value=recorder
+        ):
+            recorded = self.sample_transfer(source_bank, destination_bank)
+            recorded.send_request_to_banks()
+
+        replay = ReplayTransport(self.log_path, speed=0, match="operation")
+        with patch("bank_agent.services.get_transport", return_value=replay):
+            replayed = self.sample_transfer(source_bank, destination_bank)
+            replayed.send_request_to_banks()
+
+        self.assertEqual(put.call_count, 2)
+        self.assertTrue(recorded.completed)
+        self.assertTrue(replayed.completed)
+
+    def sample_transfer(self, source_bank, destination_bank):
+        return TransferRequest.objects.create(
+            source_bank=source_bank,
+            source_account_id=uuid4(),
+            destination_bank=destination_bank,
+            destination_account_id=uuid4(),
+            amount=10,
+            info="test info",
+        )
@@ -0,0 +1,144 @@
+import threading
+from decimal import Decimal
+from unittest.mock import patch
+from uuid import uuid4
+
+from django.test import SimpleTestCase, TestCase
+
+from bank_agent.models import Bank, TransferRequest
+from bank_agent.utils import sample_bank
+from bank_agent.velocity import VelocityLimiter
+
+
+class VelocityLimiterTests(SimpleTestCase):
+    """Test the sliding window velocity limiter"""
+
+    def test_disabled_without_limits(self):
+        """Test every transfer is allowed when no limit is set"""
+        limiter = VelocityLimiter(window=60)
+        limiter.record(1, "account", Decimal(10))
+
+        self.assertIsNone(limiter.check(1, "account", Decimal(10**9)))
+
+    def test_max_transfers(self):
+        """Test the number of transfers in the window is limited"""
+        limiter = VelocityLimiter(window=60, max_transfers=2)
+        limiter.record(1, "account", Decimal(10))
+        self.assertIsNone(limiter.check(1, "account", Decimal(10)))
+
+        self.assertIn("2 transfers", limiter.check(1, "account", Decimal(1)))
+        self.assertIsNone(limiter.check(1, "other", Decimal(1)))
+        self.assertIsNone(limiter.check(2, "account", Decimal(1)))
+
+    def test_max_amount(self):
+        """Test the amount transferred in the window is limited"""
+        limiter = VelocityLimiter(window=60, max_amount=Decimal(100))
+        limiter.record(1, "account", Decimal(60))
+
+        self.assertIn("100", limiter.check(1, "account", Decimal("40.01")))
+        self.assertIsNone(limiter.check(1, "account", Decimal(40)))
+        self.assertIsNotNone(limiter.check(1, "account", Decimal("0.01")))
+
+    def test_release(self):
+        """Test a released transfer no longer counts"""
+        limiter = VelocityLimiter(window=60, max_transfers=1)
+        self.assertIsNone(limiter.check(1, "account", Decimal(10)))
+        self.assertIsNotNone(limiter.check(1, "account", Decimal(10)))
+
+        limiter.release(1, "account", Decimal(10))
+        self.assertIsNone(limiter.check(1, "account", Decimal(10)))
+
+    def test_concurrent_checks_reserve(self):
+        """Test concurrent transfers of an account can not exceed the limit
+        together"""
+        limiter = VelocityLimiter(window=60, max_transfers=5)
+        barrier = threading.Barrier(20)
+        allowed = []
+
+        def check():
+            barrier.wait()
+            if limiter.check(1, "account", Decimal(10)) is None:
+                allowed.append(1)
+
+        threads = [threading.Thread(target=check) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(allowed), 5)
+
+    @patch("bank_agent.velocity.time.time")
+    def test_window_slides(self, now):
+        """Test transfers older than the window are no longer counted"""
+        limiter = VelocityLimiter(window=60, max_transfers=1)
+        now.return_value = 1000
+        limiter.record(1, "account", Decimal(10))
+        self.assertIsNotNone(limiter.check(1, "account", Decimal(10)))
+
+        now.return_value = 1061
+        self.assertIsNone(limiter.check(1, "account", Decimal(10)))
+
+
+@patch(
+    "bank_agent.services.BankAppAPIClient.intra_bank_transfer_request",
+    return_value=(201, "Success"),
+)
+class VelocityTransferTests(TestCase):
+    """Test velocity checks on transfer requests"""
+
+    def setUp(self):
+        self.bank: Bank = sample_bank()
+        self.account_id = uuid4()
+        self.limiter = VelocityLimiter(window=3600, max_transfers=2)
+        patcher = patch("bank_agent.models.velocity_limits", self.limiter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sample_transfer(self, **kwargs):
+        return TransferRequest.objects.create(
+            source_bank=self.bank,
+            source_account_id=self.account_id,
+            destination_bank=self.bank,
+            destination_account_id=uuid4(),
+            amount=10,
+            info="test info",
+            **kwargs,
+        )
+
+    def test_counters_rebuilt_from_history(self, intra_bank_service):
+        """Test completed transfers of the window count towards the limit"""
+        self.sample_transfer(completed=True)
+        self.sample_transfer(completed=False)
+        self.limiter.rebuild()
+
+        transfer = self.sample_transfer()
+        transfer.send_request_to_banks()
+        self.assertTrue(transfer.completed)
+
+        rejected = self.sample_transfer()
+        rejected.send_request_to_banks()
+
+        self.assertFalse(rejected.completed)
+        self.assertIn("Velocity limit exceeded", rejected.service_detail)
+        self.assertEqual(intra_bank_service.call_count, 1)
+
+    def test_failed_transfer_released(self, intra_bank_service):
+        """Test a transfer the bank refuses does not count towards the
+        limit"""
+        intra_bank_service.return_value = (400, "source: Insufficient funds")
+        for _ in range(3):
+            self.sample_transfer().send_request_to_banks()
+
+        intra_bank_service.return_value = (201, "Success")
+        transfers = [self.sample_transfer() for _ in range(2)]
+        for transfer in transfers:
+            transfer.send_request_to_banks()
+
+        self.assertTrue(all(transfer.completed for transfer in transfers))
+        self.assertEqual(intra_bank_service.call_count, 5)
+
+    def test_check_does_not_query(self, intra_bank_service):
+        """Test the velocity check adds no query"""
+        with self.assertNumQueries(0):
+            self.limiter.check(self.bank.id, self.account_id, Decimal(10))
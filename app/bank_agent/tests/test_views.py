@@ -2,6 +2,7 @@ from django.urls import reverse
 from django.test import TestCase
 from unittest.mock import patch
 
+from bank_agent.forms import TransferRequestFilterForm
 from bank_agent.models import Bank, TransferRequest
 from bank_agent.utils import sample_bank
 
@@ -165,3 +166,37 @@ class PublicViewsTests(TestCase):
             "93c does not exist.",
             res.content.decode(),
         )
+
+    @patch("bank_agent.services.BankAppAPIClient.add_fund_request")
+    @patch("bank_agent.services.BankAppAPIClient.retire_fund_request")
+    def test_post_for_inter_bank_add_timed_out(
+        self, retire_fund_service, add_fund_service
+    ):
+        """
+        Test post view when adding the fund times out, the bank may have
+        added it so it is not reversed and the outcome is left unknown
+        """
+        bank_1: Bank = sample_bank()
+        bank_2: Bank = sample_bank()
+        payload = {
+            "source_bank": bank_1.id,
+            "source_account_id": "8bce8de8-4856-4113-aff7-0812a5c6ea29",
+            "destination_bank": bank_2.id,
+            "destination_account_id": "bbbadca3-2fdb-4036-ae04-c23dca10c93c",
+            "amount": 10,
+            "info": "test info",
+        }
+
+        retire_fund_service.return_value = (201, "Success")
+        add_fund_service.return_value = (504, "Service timed out.")
+        self.client.post(INDEX_URL, payload)
+
+        transfer_request = TransferRequest.objects.get()
+
+        add_fund_service.assert_called_once()
+        self.assertIsNone(transfer_request.completed)
+        self.assertEqual(transfer_request.service_detail, "Service timed out.")
+        unknown = TransferRequestFilterForm({"status": "unknown"}).filter(
+            TransferRequest.objects.all()
+        )
+        self.assertEqual(list(unknown), [transfer_request])
@@ -0,0 +1,225 @@
+"""Transports used by ``BankAppAPIClient`` to reach the banks.
+
+* ``HTTPTransport`` talks to the live bank urls
+* ``RecordingTransport`` wraps another transport and appends every
+  request/response pair with its latency to a JSONL log
+* ``ReplayTransport`` serves the responses of such a log back, at the
+  recorded speed or accelerated, without any network access
+
+The transport used by default is chosen with the ``BANK_TRANSPORT``
+setting (``http``, ``record`` or ``replay``).
+"""
+import json
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from django.conf import settings
+
+
+class ReplayMissError(LookupError):
+    """Raised when a replayed request has no recorded response"""
+
+
+class HTTPTransport:
+    """Sends requests to the banks over HTTP"""
+
+    def put(self, url: str, headers: dict, data: dict, timeout=None):
+        """Sends a PUT request
+
+        Raises ``requests.exceptions.ConnectionError`` when the bank can not
+        be reached and ``requests.exceptions.Timeout`` when it does not
+        answer within timeout seconds.
+        """
+        import requests
+
+        return requests.put(url, headers=headers, data=data, timeout=timeout)
+
+
+class ReplayResponse:
+    """Recorded response with the parts of ``requests.Response`` the
+    client uses"""
+
+    def __init__(self, status_code: int, text: str) -> None:
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def _operation(url: str) -> str:
+    """Returns the bank operation of a url, ``transfer``, ``retire`` or
+    ``add``"""
+    return url.rstrip("/").rsplit("/", 1)[-1]
+
+
+def _request_key(url: str, data: dict) -> Tuple[str, str]:
+    payload = json.dumps(
+        {key: str(value) for key, value in data.items()}, sort_keys=True
+    )
+    return url, payload
+
+
+class RecordingTransport:
+    """Records the traffic of another transport to an append-only log
+
+    Parameters
+    ----------
+    log_path : str
+        JSONL log, appended to
+    transport : optional
+        Transport doing the actual requests, HTTP by default
+    """
+
+    def __init__(self, log_path: str, transport=None) -> None:
+        self.log_path = log_path
+        self.transport = transport or HTTPTransport()
+        self._lock = threading.Lock()
+
+    def put(self, url: str, headers: dict, data: dict, timeout=None):
+        import requests
+
+        started = time.perf_counter()
+        try:
+            res = self.transport.put(url, headers, data, timeout=timeout)
+        except requests.exceptions.Timeout:
+            self._write(
+                url, data, time.perf_counter() - started, None, "", "timeout"
+            )
+            raise
+        except requests.exceptions.ConnectionError:
+            self._write(url, data, time.perf_counter() - started, None, "")
+            raise
+
+        self._write(
+            url, data, time.perf_counter() - started, res.status_code, res.text
+        )
+        return res
+
+    def _write(
+        self,
+        url: str,
+        data: dict,
+        latency: float,
+        status_code: Optional[int],
+        text: str,
+        error: Optional[str] = None,
+    ) -> None:
+        # the authorization header is left out, tokens are not recorded
+        record = {
+            "url": url,
+            "data": {key: str(value) for key, value in data.items()},
+            "latency": round(latency, 6),
+            "status": status_code,
+            "body": text,
+        }
+        if error is not None:
+            record["error"] = error
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            with open(self.log_path, "a") as log:
+                log.write(line)
+
+
+class ReplayTransport:
+    """Serves recorded responses back from a log
+
+    Requests are looked up by url and payload. With ``match="operation"``
+    they are looked up by bank operation only, which replays recorded
+    traffic for transfers that were not part of the recording. Recorded
+    responses for a key are served in order and then cycled.
+
+    Parameters
+    ----------
+    log_path : str
+        JSONL log written by ``RecordingTransport``
+    speed : float
+        Replay speed, 1 waits for the recorded latency, 2 for half of it
+        and 0 does not wait
+    match : str
+        ``exact`` or ``operation``
+    """
+
+    def __init__(
+        self, log_path: str, speed: float = 1.0, match: str = "exact"
+    ) -> None:
+        if match not in ("exact", "operation"):
+            raise ValueError(f"unknown replay match {match!r}")
+
+        self.speed = speed
+        self.match = match
+        self._lock = threading.Lock()
+        self._index: Dict[object, Deque[dict]] = {}
+
+        with open(log_path) as log:
+            for line in log:
+                if line.strip():
+                    record = json.loads(line)
+                    key = self._key(record["url"], record["data"])
+                    self._index.setdefault(key, deque()).append(record)
+
+    def _key(self, url: str, data: dict):
+        if self.match == "operation":
+            return _operation(url)
+        return _request_key(url, data)
+
+    def put(self, url: str, headers: dict, data: dict, timeout=None):
+        import requests
+
+        records = self._index.get(self._key(url, data))
+        if not records:
+            raise ReplayMissError(f"no recorded response for PUT {url}")
+
+        with self._lock:
+            record = records[0]
+            records.rotate(-1)
+
+        latency = record["latency"]
+        timed_out = timeout is not None and latency > timeout
+        if timed_out:
+            latency = timeout
+        if self.speed:
+            time.sleep(latency / self.speed)
+
+        if timed_out:
+            raise requests.exceptions.ReadTimeout(
+                f"recorded response for PUT {url} is slower than {timeout}s"
+            )
+        if record.get("error") == "timeout":
+            raise requests.exceptions.ReadTimeout(
+                f"recorded timeout for PUT {url}"
+            )
+        if record["status"] is None:
+            raise requests.exceptions.ConnectionError(
+                f"recorded connection error for PUT {url}"
+            )
+        return ReplayResponse(record["status"], record["body"])
+
+
+_transport = None
+
+
+def get_transport():
+    """Returns the process wide transport configured in the settings"""
+    global _transport
+
+    if _transport is None:
+        if settings.BANK_TRANSPORT == "record":
+            _transport = RecordingTransport(settings.BANK_TRANSPORT_LOG)
+        elif settings.BANK_TRANSPORT == "replay":
+            _transport = ReplayTransport(
+                settings.BANK_TRANSPORT_LOG,
+                speed=settings.BANK_TRANSPORT_REPLAY_SPEED,
+                match=settings.BANK_TRANSPORT_REPLAY_MATCH,
+            )
+        else:
+            _transport = HTTPTransport()
+    return _transport
+
+
+def reset_transport() -> None:
+    """Drops the configured transport so the settings are read again"""
+    global _transport
+    _transport = None
@@ -1,11 +1,19 @@
 from django.urls import path
 
-from bank_agent.views import index
+from bank_agent.views import (
+    admission_state,
+    bank_callback,
+    bank_lookup,
+    index,
+)
 
 
 app_name = 'bank_agent'
 
 
 urlpatterns = [
-    path("", index, name="index")
+    path("", index, name="index"),
+    path("banks/", bank_lookup, name="bank_lookup"),
+    path("callbacks/", bank_callback, name="bank_callback"),
+    path("admission/", admission_state, name="admission_state"),
 ]
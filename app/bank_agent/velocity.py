@@ -0,0 +1,247 @@
+import datetime
+import threading
+import time
+from collections import deque
+from decimal import Decimal
+from typing import Deque, Dict, Optional, Tuple
+
+from django.conf import settings
+
+
+class SlidingWindow:
+    """Transfers of one account within the last ``window`` seconds"""
+
+    __slots__ = ("events", "total")
+
+    def __init__(self) -> None:
+        self.events: Deque[Tuple[float, Decimal]] = deque()
+        self.total = Decimal(0)
+
+    def prune(self, since: float) -> None:
+        """Drops the transfers made before since"""
+        events = self.events
+        while events and events[0][0] < since:
+            self.total -= events.popleft()[1]
+
+
+class VelocityLimiter:
+    """In-memory per account limits on the number and amount of transfers
+    over a sliding window
+
+    Counters are rebuilt from the completed transfers of the last window by
+    ``rebuild`` when a process starts, then updated as transfers are
+    checked, so checks do not query the database. A transfer allowed by
+    ``check`` is reserved in the counters until it is released, so
+    concurrent transfers of an account can not exceed the limits together.
+    Each process keeps its own counters.
+
+    Parameters
+    ----------
+    window : float
+        Window length in seconds
+    max_transfers : int, optional
+        Maximum number of transfers per account in the window
+    max_amount : Decimal, optional
+        Maximum transferred amount per account in the window
+    """
+
+    # drop idle accounts every this many recorded transfers
+    sweep_every = 10_000
+
+    def __init__(
+        self,
+        window: float,
+        max_transfers: Optional[int] = None,
+        max_amount: Optional[Decimal] = None,
+    ) -> None:
+        self.window = window
+        self.max_transfers = max_transfers
+        self.max_amount = max_amount
+        self._windows: Dict[Tuple[int, str], SlidingWindow] = {}
+        self._lock = threading.Lock()
+        self._recorded = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_transfers is not None or self.max_amount is not None
+
+    def check(
+        self, bank_id: int, account_id: str, amount: Decimal
+    ) -> Optional[str]:
+        """Checks if a new transfer would exceed the account limits and
+        reserves it in the counters when it does not
+
+        A reserved transfer counts like a completed one, it must be given
+        back with ``release`` if it does not complete.
+
+        Parameters
+        ----------
+        bank_id : int
+            Source bank primary key
+        account_id : str
+            Source account uuid
+        amount : Decimal
+            Amount of the new transfer
+
+        Returns
+        -------
+        Optional[str]
+            Reason the transfer is rejected, None if it is allowed and
+            reserved
+        """
+        if not self.enabled:
+            return None
+
+        key = (bank_id, str(account_id))
+        now = time.time()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                count, total = 0, Decimal(0)
+            else:
+                window.prune(now - self.window)
+                count, total = len(window.events), window.total
+
+            if (
+                self.max_transfers is not None
+                and count + 1 > self.max_transfers
+            ):
+                return (
+                    f"Velocity limit exceeded: more than "
+                    f"{self.max_transfers} transfers in {self.window:g} "
+                    f"seconds"
+                )
+            if (
+                self.max_amount is not None
+                and total + amount > self.max_amount
+            ):
+                return (
+                    f"Velocity limit exceeded: more than {self.max_amount} "
+                    f"transferred in {self.window:g} seconds"
+                )
+            self._add(key, now, amount)
+        return None
+
+    def release(
+        self, bank_id: int, account_id: str, amount: Decimal
+    ) -> None:
+        """Gives back a transfer reserved by ``check`` that did not
+        complete
+
+        Reserved transfers of an account with the same amount count the
+        same, the most recent one is dropped.
+
+        Parameters
+        ----------
+        bank_id : int
+            Source bank primary key
+        account_id : str
+            Source account uuid
+        amount : Decimal
+            Amount of the reserved transfer
+        """
+        if not self.enabled:
+            return
+
+        amount = Decimal(amount)
+        with self._lock:
+            window = self._windows.get((bank_id, str(account_id)))
+            if window is None:
+                return
+            events = window.events
+            for index in range(len(events) - 1, -1, -1):
+                if events[index][1] == amount:
+                    del events[index]
+                    window.total -= amount
+                    return
+
+    def record(
+        self,
+        bank_id: int,
+        account_id: str,
+        amount: Decimal,
+        at: Optional[float] = None,
+    ) -> None:
+        """Counts a completed transfer that was not reserved by ``check``
+
+        Parameters
+        ----------
+        bank_id : int
+            Source bank primary key
+        account_id : str
+            Source account uuid
+        amount : Decimal
+            Transferred amount
+        at : float, optional
+            Unix timestamp of the transfer, now by default
+        """
+        if not self.enabled:
+            return
+
+        at = time.time() if at is None else at
+        with self._lock:
+            self._add((bank_id, str(account_id)), at, amount)
+
+    def _add(self, key: Tuple[int, str], at: float, amount: Decimal) -> None:
+        window = self._windows.get(key)
+        if window is None:
+            window = self._windows[key] = SlidingWindow()
+        window.events.append((at, Decimal(amount)))
+        window.total += Decimal(amount)
+
+        self._recorded += 1
+        if self._recorded % self.sweep_every == 0:
+            self._sweep()
+
+    def _sweep(self) -> None:
+        since = time.time() - self.window
+        for key in list(self._windows):
+            window = self._windows[key]
+            window.prune(since)
+            if not window.events:
+                del self._windows[key]
+
+    def rebuild(self) -> None:
+        """Rebuilds the counters from the completed transfers of the last
+        window, called when a process starts before it checks transfers"""
+        if not self.enabled:
+            return
+
+        from django.utils import timezone
+
+        from bank_agent.models import TransferRequest
+
+        since = timezone.now() - datetime.timedelta(seconds=self.window)
+        transfers = (
+            TransferRequest.objects.filter(created__gte=since, completed=True)
+            .order_by("created")
+            .values_list(
+                "source_bank_id", "source_account_id", "amount", "created"
+            )
+            .iterator(chunk_size=5000)
+        )
+
+        # built aside and swapped in, checks never see partial counters
+        windows: Dict[Tuple[int, str], SlidingWindow] = {}
+        for bank_id, account_id, amount, created in transfers:
+            key = (bank_id, str(account_id))
+            window = windows.get(key)
+            if window is None:
+                window = windows[key] = SlidingWindow()
+            window.events.append((created.timestamp(), amount))
+            window.total += amount
+
+        with self._lock:
+            self._windows = windows
+
+    def clear(self) -> None:
+        """Drops every counter"""
+        with self._lock:
+            self._windows = {}
+
+
+velocity_limits = VelocityLimiter(
+    window=settings.VELOCITY_WINDOW,
+    max_transfers=settings.VELOCITY_MAX_TRANSFERS,
+    max_amount=settings.VELOCITY_MAX_AMOUNT,
+)
@@ -1,30 +1,241 @@
+import hashlib
+import json
+import sys
+from typing import List, Optional, Sequence
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import cache
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 
 import django_tables2 as tables
+from django_tables2 import RequestConfig
 
-from bank_agent.models import TransferRequest
-from bank_agent.forms import TransferRequestForm
+from bank_agent.admission import admission
+from bank_agent.callbacks import callback_buffer
+from bank_agent.models import Bank, TransferRequest
+from bank_agent.forms import TransferRequestFilterForm, TransferRequestForm
+from bank_agent.history import render_history_rows
 
 
 class TransferRequestTable(tables.Table):
+    """Transfer request history
+
+    Parameters
+    ----------
+    orderings : Sequence[str]
+        Columns the rows can be ordered by, those the filters leave backed
+        by an index
+    """
+
+    # only orderings backed by an index can be requested
+    amount = tables.Column(orderable=True)
+    created = tables.DateTimeColumn(orderable=True)
+    service_detail = tables.Column(verbose_name="Service detail")
+
     class Meta:
         model = TransferRequest
+        exclude = ("detail", "schedule")
+        sequence = ("...", "service_detail", "completed", "created")
+        orderable = False
+        template_name = "bank_agent/history_table.html"
+
+    def __init__(
+        self, *args, orderings: Sequence[str] = ("amount", "created"), **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        for name in ("amount", "created"):
+            self.columns[name].column.orderable = name in orderings
+
+    def rows_html(self):
+        """Rows of the current page, rendered by ``render_history_rows``"""
+        return render_history_rows(self)
+
+
+def shed_response(reason: str, status: int) -> HttpResponse:
+    """Response to a transfer submission shed by admission control"""
+    response = HttpResponse(reason, status=status, content_type="text/plain")
+    response["Retry-After"] = str(admission.retry_after)
+    return response
 
 
 def index(request):
 
     form = TransferRequestForm()
     if request.method == "POST":
+        # fail fast while the banks are not keeping up, reads still go on
+        shed_reason = admission.admit()
+        if shed_reason is not None:
+            return shed_response(shed_reason, 503)
+
         form = TransferRequestForm(request.POST)
 
         if form.is_valid():
+            shed_reason = admission.admit(
+                [
+                    form.cleaned_data["source_bank"].uuid,
+                    form.cleaned_data["destination_bank"].uuid,
+                ]
+            )
+            if shed_reason is not None:
+                return shed_response(shed_reason, 429)
+
             transer_request: TransferRequest = form.save()
             transer_request.send_request_to_banks()
 
-    table = TransferRequestTable(TransferRequest.objects.all())
+    filter_form = TransferRequestFilterForm(request.GET or None)
+    table = TransferRequestTable(
+        filter_form.filter(
+            TransferRequest.objects.select_related(
+                "source_bank", "destination_bank"
+            )
+        ),
+        orderings=filter_form.orderings(),
+    )
+    RequestConfig(request, paginate={"per_page": 25}).configure(table)
     context = {
         "form": form,
+        "filter_form": filter_form,
         "table": table,
     }
 
     return render(request, "index.html", context)
+
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Returns the smallest string greater than every string starting
+    with prefix, None when there is none"""
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if not prefix:
+        return None
+    next_code_point = ord(prefix[-1]) + 1
+    if 0xD800 <= next_code_point <= 0xDFFF:
+        # surrogates cannot be encoded, the next character is U+E000
+        next_code_point = 0xE000
+    return prefix[:-1] + chr(next_code_point)
+
+
+def search_banks(prefix: str, limit: int) -> List[dict]:
+    """Returns banks whose name starts with prefix, case insensitive
+
+    The prefix is matched with a range on ``name_lower`` so the lookup is
+    served by its index instead of scanning every bank.
+    """
+    prefix = prefix.lower()
+    banks = Bank.objects.filter(name_lower__gte=prefix)
+    upper_bound = prefix_upper_bound(prefix)
+    if upper_bound is not None:
+        banks = banks.filter(name_lower__lt=upper_bound)
+    banks = banks.order_by("name_lower").values("id", "name", "uuid")
+    return [
+        {"id": bank["id"], "text": f"{bank['name']} ({bank['uuid']})"}
+        for bank in banks[:limit]
+    ]
+
+
+def bank_lookup(request):
+    prefix = request.GET.get("q", "").strip()
+    if not prefix:
+        return JsonResponse({"results": []})
+
+    prefix_hash = hashlib.md5(prefix.lower().encode()).hexdigest()
+    cache_key = f"bank_lookup:{prefix_hash}"
+    results = cache.get(cache_key)
+    if results is None:
+        results = search_banks(prefix, settings.BANK_LOOKUP_LIMIT)
+        cache.set(cache_key, results, settings.BANK_LOOKUP_CACHE_TTL)
+
+    return JsonResponse({"results": results})
+
+
+def authenticated_bank_id(request) -> Optional[int]:
+    """Returns the bank of the ``Authorization: Token`` header, if any"""
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    if not header.startswith("Token "):
+        return None
+
+    token = header[len("Token "):].strip()
+    token_hash = hashlib.sha256(token.encode()).hexdigest()
+    cache_key = f"bank_token:{token_hash}"
+    bank_id = cache.get(cache_key)
+    if bank_id is None:
+        bank_id = (
+            Bank.objects.filter(token=token)
+            .values_list("id", flat=True)
+            .first()
+        )
+        if bank_id is not None:
+            cache.set(cache_key, bank_id, settings.BANK_LOOKUP_CACHE_TTL)
+    return bank_id
+
+
+@csrf_exempt
+@require_POST
+def bank_callback(request):
+    """Receives settlement notifications from a bank
+
+    The body is a notification, a list of notifications or
+    ``{"notifications": [...]}``, where a notification is
+    ``{"transfer": <id>, "completed": <bool>, "detail": <str>}``.
+    Notifications for transfers the bank is not part of, or whose outcome
+    is no longer unknown, are rejected, the others are buffered and
+    applied in batches.
+    """
+    bank_id = authenticated_bank_id(request)
+    if bank_id is None:
+        return JsonResponse({"detail": "Invalid token."}, status=401)
+
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"detail": "Invalid JSON."}, status=400)
+
+    if isinstance(payload, dict):
+        payload = payload.get("notifications", [payload])
+
+    notifications = {}
+    try:
+        for notification in payload:
+            completed = notification["completed"]
+            if not isinstance(completed, bool):
+                raise TypeError("completed must be a boolean")
+            detail = notification.get("detail") or (
+                "Success" if completed else "Service is unavailable"
+            )
+            notifications[int(notification["transfer"])] = (
+                completed,
+                str(detail),
+            )
+    except (KeyError, TypeError, ValueError):
+        return JsonResponse({"detail": "Invalid notification."}, status=400)
+
+    transfer_ids = TransferRequest.objects.filter(
+        Q(source_bank_id=bank_id) | Q(destination_bank_id=bank_id),
+        pk__in=list(notifications),
+        completed=None,
+    ).values_list("id", flat=True)
+
+    accepted = set()
+    for transfer_id in transfer_ids:
+        completed, detail = notifications[transfer_id]
+        callback_buffer.add(transfer_id, completed, detail)
+        accepted.add(transfer_id)
+
+    return JsonResponse(
+        {
+            "accepted": len(accepted),
+            "rejected": sorted(set(notifications) - accepted),
+        },
+        status=202,
+    )
+
+
+@staff_member_required
+def admission_state(request):
+    """Outstanding bank calls and shed submissions, for staff only as it
+    lists the banks being called"""
+    return JsonResponse(admission.state())
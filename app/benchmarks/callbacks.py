@@ -0,0 +1,88 @@
+"""Throughput benchmark for the bank callback endpoint on SQLite.
+
+Posts batches of settlement notifications through the Django test client
+and reports notifications applied per second, including the final flush.
+
+Run from the ``app`` directory:
+
+    python -m benchmarks.callbacks [--transfers N] [--batch N]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import uuid
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transfers", type=int, default=20_000)
+    parser.add_argument("--batch", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+
+    import django
+    from django.conf import settings
+
+    work_dir = tempfile.TemporaryDirectory()
+    settings.DATABASES["default"]["NAME"] = os.path.join(
+        work_dir.name, "db.sqlite3"
+    )
+    settings.ALLOWED_HOSTS = ["testserver"]
+    django.setup()
+
+    from django.core.management import call_command
+    from django.test import Client
+
+    from bank_agent.callbacks import callback_buffer
+    from bank_agent.models import TransferRequest
+    from bank_agent.utils import sample_bank
+
+    call_command("migrate", verbosity=0)
+    bank = sample_bank(token="benchmark-token")
+    TransferRequest.objects.bulk_create(
+        TransferRequest(
+            source_bank=bank,
+            source_account_id=uuid.uuid4(),
+            destination_bank=bank,
+            destination_account_id=uuid.uuid4(),
+            amount=10,
+            info="callback benchmark",
+            # awaiting the bank confirmation
+            completed=None,
+        )
+        for _ in range(args.transfers)
+    )
+    transfer_ids = list(TransferRequest.objects.values_list("id", flat=True))
+
+    client = Client()
+    started = time.perf_counter()
+    for offset in range(0, len(transfer_ids), args.batch):
+        payload = [
+            {"transfer": transfer_id, "completed": True}
+            for transfer_id in transfer_ids[offset:offset + args.batch]
+        ]
+        res = client.post(
+            "/callbacks/",
+            json.dumps(payload),
+            content_type="application/json",
+            HTTP_AUTHORIZATION="Token benchmark-token",
+        )
+        assert res.status_code == 202, res.content
+    callback_buffer.flush()
+    elapsed = time.perf_counter() - started
+
+    completed = TransferRequest.objects.filter(completed=True).count()
+    assert completed == len(transfer_ids), completed
+    print(
+        f"{len(transfer_ids)} notifications in {elapsed:.2f}s: "
+        f"{len(transfer_ids) / elapsed:,.0f} notifications/s "
+        f"(batch {args.batch}, flush delay {callback_buffer.delay}s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Throughput benchmark for batched inter-bank settlement.
+
+Sends the same inter-bank transfers between two banks served by a
+stand-in bank with ``dispatch_many``, once with per-transfer calls and
+once with settlement windows, and reports transfers settled per second
+and the number of requests the banks received.
+
+Run from the ``app`` directory:
+
+    python -m benchmarks.settlement [--transfers N] [--window S]
+"""
+import argparse
+import os
+import tempfile
+import time
+import uuid
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transfers", type=int, default=2000)
+    parser.add_argument("--window", type=float, default=0.05)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.01)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+
+    import django
+    from django.conf import settings
+
+    work_dir = tempfile.TemporaryDirectory()
+    settings.DATABASES["default"]["NAME"] = os.path.join(
+        work_dir.name, "db.sqlite3"
+    )
+    django.setup()
+
+    from django.core.management import call_command
+
+    from bank_agent.dispatch import dispatch_many
+    from bank_agent.models import TransferRequest
+    from bank_agent.settlement import settlement_batcher
+    from bank_agent.utils import sample_bank
+    from benchmarks.stand_in_bank import StandInBank
+
+    call_command("migrate", verbosity=0)
+
+    with StandInBank(latency=args.latency) as bank_api:
+        banks = [sample_bank(url=bank_api.url) for _ in range(2)]
+        for bank in banks:
+            bank.supports_batch = True
+            bank.save()
+
+        TransferRequest.objects.bulk_create(
+            TransferRequest(
+                source_bank=banks[index % 2],
+                source_account_id=uuid.uuid4(),
+                destination_bank=banks[(index + 1) % 2],
+                destination_account_id=uuid.uuid4(),
+                amount=10,
+                info="settlement benchmark",
+            )
+            for index in range(args.transfers)
+        )
+
+        for name, window in (("per transfer", 0), ("batched", args.window)):
+            TransferRequest.objects.update(completed=False, detail=None)
+            settlement_batcher.window = window
+            settlement_batcher.max_size = args.batch
+            requests_before = bank_api.request_count
+
+            started = time.perf_counter()
+            results = dispatch_many(
+                TransferRequest.objects.all(), max_workers=args.workers
+            )
+            elapsed = time.perf_counter() - started
+
+            assert results["completed"] == args.transfers, results
+            print(
+                f"{name:>12}: {args.transfers} transfers in {elapsed:.2f}s, "
+                f"{args.transfers / elapsed:,.0f} transfers/s, "
+                f"{bank_api.request_count - requests_before} bank requests"
+            )
+
+
+if __name__ == "__main__":
+    main()
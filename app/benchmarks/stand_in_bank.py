@@ -0,0 +1,83 @@
+"""Minimal stand-in for a partner bank API used by the benchmarks.
+
+Accepts the ``transfer/``, ``<account>/retire/`` and ``<account>/add/``
+PUT requests sent by ``BankAppAPIClient`` and answers every one of them
+with a ``201`` after an optional artificial delay. The batched
+``retire/batch/`` and ``add/batch/`` requests get a ``201`` result for
+each of their operations.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class StandInBankHandler(BaseHTTPRequestHandler):
+    """Answers bank operations with a successful empty JSON body"""
+
+    def do_PUT(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = self.rfile.read(length)
+        self.server.request_count += 1
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        body = {}
+        if self.path.endswith("/batch/"):
+            operations = json.loads(
+                parse_qs(payload.decode())["operations"][0]
+            )
+            body = {"results": [{"status": 201} for _ in operations]}
+        body = json.dumps(body).encode()
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        # keep benchmark output clean
+        pass
+
+
+class StandInBankServer(ThreadingHTTPServer):
+    # room for the connections of many concurrent dispatch workers
+    request_queue_size = 128
+
+
+class StandInBank:
+    """Runs a stand-in bank on a background thread
+
+    Parameters
+    ----------
+    latency : float
+        Seconds to wait before answering each request
+    """
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.server = StandInBankServer(("127.0.0.1", 0), StandInBankHandler)
+        self.server.daemon_threads = True
+        self.server.latency = latency
+        self.server.request_count = 0
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @property
+    def request_count(self) -> int:
+        return self.server.request_count
+
+    def __enter__(self) -> "StandInBank":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,106 @@
+"""Startup benchmark for the web and slim worker settings profiles.
+
+Each run starts a fresh interpreter so that module caches do not leak
+between measurements, and reports:
+
+* import time: importing Django and running ``django.setup()``
+* time to first transfer: import time plus the first
+  ``TransferRequest.send_request_to_banks`` call against a stand-in bank
+
+Run from the ``app`` directory:
+
+    python -m benchmarks.startup [--runs N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.stand_in_bank import StandInBank
+
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+PROFILES = {
+    "web": "app.settings",
+    "slim": "app.settings_worker",
+}
+
+# executed in a fresh interpreter for every run
+CHILD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+
+import django
+from django.conf import settings
+
+settings.DATABASES["default"]["NAME"] = ":memory:"
+django.setup()
+imported = time.perf_counter()
+
+from django.core.management import call_command
+from bank_agent.models import TransferRequest
+from bank_agent.utils import sample_bank
+
+call_command("migrate", verbosity=0)
+bank = sample_bank(url=sys.argv[1])
+transfer = TransferRequest.objects.create(
+    source_bank=bank,
+    source_account_id="8bce8de8-4856-4113-aff7-0812a5c6ea29",
+    destination_bank=bank,
+    destination_account_id="bbbadca3-2fdb-4036-ae04-c23dca10c93c",
+    amount=10,
+    info="startup benchmark",
+)
+prepared = time.perf_counter()
+transfer.send_request_to_banks()
+transferred = time.perf_counter()
+
+assert transfer.completed, transfer.service_detail
+print(json.dumps({
+    "import": imported - started,
+    "first_transfer": (imported - started) + (transferred - prepared),
+}))
+"""
+
+
+def run_once(settings_module: str, bank_url: str) -> dict:
+    """Runs the child script once under the given settings module"""
+    env = dict(os.environ)
+    env["DJANGO_SETTINGS_MODULE"] = settings_module
+    env.setdefault("SECRET_KEY", "benchmark")
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, bank_url],
+        cwd=APP_DIR,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with StandInBank() as bank:
+        print(f"{'profile':<8}{'import (ms)':>14}{'first transfer (ms)':>22}")
+        for profile, settings_module in PROFILES.items():
+            samples = [
+                run_once(settings_module, bank.url) for _ in range(args.runs)
+            ]
+            import_ms = statistics.median(s["import"] for s in samples)
+            first_ms = statistics.median(s["first_transfer"] for s in samples)
+            print(
+                f"{profile:<8}{import_ms * 1000:>14.1f}"
+                f"{first_ms * 1000:>22.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Storage benchmark for transfer request rows on SQLite.
+
+Fills a database at the schema before compact storage (decimal amounts,
+service details as text), measures the bytes per row of the transfer
+request table and its indexes and the speed of aggregate queries, then
+runs the migration to integer minor units and interned service details
+and measures again.
+
+Run from the ``app`` directory:
+
+    python -m benchmarks.storage [--transfers N]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+
+BEFORE = ("bank_agent", "0009_history_indexes")
+AFTER = ("bank_agent", "0010_compact_transfer_storage")
+
+DETAILS = [
+    "Success",
+    "Service is unavailable.",
+    "Service timed out.",
+    "Insufficient funds",
+    "Account does not exist",
+    "Account is closed",
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transfers", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+
+    import django
+    from django.conf import settings
+
+    work_dir = tempfile.TemporaryDirectory()
+    settings.DATABASES["default"]["NAME"] = os.path.join(
+        work_dir.name, "db.sqlite3"
+    )
+    django.setup()
+
+    from django.core.management import call_command
+    from django.db import connection
+    from django.db.migrations.executor import MigrationExecutor
+    from django.db.models import Count, Sum
+
+    call_command("migrate", *BEFORE, verbosity=0)
+    fill(connection, args.transfers)
+
+    def measure(state, detail_field: str) -> dict:
+        with connection.cursor() as cursor:
+            cursor.execute("VACUUM")
+            cursor.execute("ANALYZE")
+        apps = MigrationExecutor(connection).loader.project_state(
+            state
+        ).apps
+        TransferRequest = apps.get_model("bank_agent", "TransferRequest")
+        table = TransferRequest._meta.db_table
+
+        table_bytes, index_bytes = table_size(connection, table)
+        print(
+            f"  bytes per row: {table_bytes / args.transfers:.1f} table, "
+            f"{index_bytes / args.transfers:.1f} indexes"
+        )
+
+        queries = {
+            "total amount": lambda: TransferRequest.objects.aggregate(
+                Sum("amount")
+            ),
+            "amount per bank": lambda: list(
+                TransferRequest.objects.order_by()
+                .values("source_bank")
+                .annotate(Sum("amount"), Count("id"))
+            ),
+            "count per detail": lambda: list(
+                TransferRequest.objects.order_by()
+                .values(detail_field)
+                .annotate(Count("id"))
+            ),
+            "completed amount": lambda: TransferRequest.objects.filter(
+                completed=True
+            ).aggregate(Sum("amount")),
+        }
+        for name, query in queries.items():
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                result = query()
+                timings.append(time.perf_counter() - started)
+            print(f"  {name:>16}: {min(timings) * 1000:8.1f} ms")
+        return result
+
+    print(f"{args.transfers} transfers, decimal amounts and text details")
+    before = measure(BEFORE, "service_detail")
+
+    started = time.perf_counter()
+    call_command("migrate", *AFTER, verbosity=0)
+    print(f"migrated in {time.perf_counter() - started:.1f}s")
+
+    print(f"{args.transfers} transfers, minor units and interned details")
+    after = measure(AFTER, "detail__text")
+    # decimals are floating point numbers in SQLite, minor units sum
+    # exactly
+    print(
+        f"completed amount: {before['amount__sum']} before, "
+        f"{after['amount__sum']} after"
+    )
+
+
+def fill(connection, transfers: int) -> None:
+    """Inserts transfers with raw SQL, the models are not at this
+    schema"""
+    rng = random.Random(0)
+    banks = [(f"bank {index}", uuid.uuid4().hex) for index in range(8)]
+    accounts = [uuid.uuid4().hex for _ in range(10_000)]
+
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO bank_agent_bank (name, uuid, token, url) "
+            "VALUES (%s, %s, 'token', 'http://bank/')",
+            banks,
+        )
+        cursor.execute("SELECT id FROM bank_agent_bank")
+        bank_ids = [row[0] for row in cursor.fetchall()]
+
+        batch = []
+        for index in range(transfers):
+            detail = DETAILS[min(int(rng.expovariate(1.5)), 5)]
+            batch.append(
+                (
+                    rng.choice(bank_ids),
+                    rng.choice(accounts),
+                    rng.choice(bank_ids),
+                    rng.choice(accounts),
+                    f"{rng.randint(100, 1_000_000) / 100:.2f}",
+                    f"transfer {index % 100}",
+                    detail,
+                    detail == "Success",
+                    f"2026-01-01 00:{index // 60 % 60:02d}:{index % 60:02d}",
+                )
+            )
+            if len(batch) == 10_000 or index == transfers - 1:
+                cursor.executemany(
+                    "INSERT INTO bank_agent_transferrequest (source_bank_id, "
+                    "source_account_id, destination_bank_id, "
+                    "destination_account_id, amount, info, service_detail, "
+                    "completed, created) "
+                    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                    batch,
+                )
+                batch = []
+
+
+def table_size(connection, table: str):
+    """Returns the bytes used by a table and by its indexes"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' "
+            "AND tbl_name = %s",
+            [table],
+        )
+        indexes = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"
+        )
+        sizes = dict(cursor.fetchall())
+    return sizes[table], sum(sizes.get(index, 0) for index in indexes)
+
+
+if __name__ == "__main__":
+    main()